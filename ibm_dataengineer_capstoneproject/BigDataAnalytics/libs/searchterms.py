@@ -0,0 +1,219 @@
+import glob
+import json
+import os
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+BACKENDS = ('pandas', 'spark')
+
+
+class TopK:
+    """Top terms of a file too large to count every distinct term, updated one chunk's value_counts() at a time.
+
+    Same algorithm as HeavyHitters in DataPipelines/airflow/log_index.py, which takes one item per
+    call. This one merges whole pandas Series so a chunk costs a few vectorized operations. The
+    reported counts can be short of the true ones by ``error`` at most.
+    """
+
+    def __init__(self, k:int=1000) -> None:
+        self.k:int = k
+        self.counts:pd.Series = pd.Series(dtype='int64')
+        self.error:int = 0
+        self.total:int = 0
+
+    def update(self, counts:pd.Series) -> None:
+        """Adds a chunk of term counts (e.g. the value_counts() of a chunk)."""
+        self.total += int(counts.sum())
+        self.counts = self.counts.add(counts, fill_value=0).astype('int64')
+        if len(self.counts) > 2 * self.k:
+            threshold = int(self.counts.nlargest(self.k).iloc[-1])
+            self.error += threshold
+            self.counts = self.counts[self.counts > threshold] - threshold
+
+    def top(self, n:int) -> pd.Series:
+        return self.counts.nlargest(n)
+
+
+class SearchTerms:
+
+    def __init__(self, path:str, chunksize:int=1_000_000, backend:str='pandas', spark=None) -> None:
+        """Single node analytics over searchterms.csv (day, month, year, searchterm)
+
+        Args:
+            - path (str): Path of searchterms.csv
+            - chunksize (int): Rows read per chunk, bounds the memory used by a scan
+            - backend (str): 'pandas' (default, no JVM) or 'spark' for inputs that do not fit one node
+            - spark (SparkSession): Session to use with the spark backend, created if None
+
+        Observations:
+            - The file is memory mapped and scanned chunk by chunk, only the searchterm column is parsed for counting
+            - Results are cached, asking several questions of the same file scans it once
+
+        Exceptions:
+            - ValueError: If the backend is not one of the supported backends
+        """
+        if backend not in BACKENDS:
+            logger.error(f"Invalid backend: {backend}")
+            raise ValueError(f"Invalid backend: {backend}. Must be one of {BACKENDS}")
+        self.path:str = path
+        self.chunksize:int = chunksize
+        self.backend:str = backend
+        self.spark = spark
+        self._term_counts:pd.Series | None = None
+        self._rows:int | None = None
+        self._columns:list[str] | None = None
+
+    def __chunks(self, usecols:list[str]=None):
+        return pd.read_csv(self.path, usecols=usecols, chunksize=self.chunksize, memory_map=True)
+
+    def __spark_df(self):
+        if self.spark is None:
+            try:
+                from pyspark.sql import SparkSession
+            except ImportError as e:
+                logger.error("The spark backend needs pyspark installed")
+                raise e
+            self.spark = SparkSession.builder.appName("Spark MLOps").getOrCreate()
+        return self.spark.read.csv(self.path, header=True, inferSchema=True)
+
+    def __count_terms(self) -> pd.Series:
+        """Counts every search term in one scan, exact (memory grows with the number of distinct terms).
+
+        Pandas backend only, the spark backend keeps its counts in Spark.
+        """
+        if self._term_counts is not None:
+            return self._term_counts
+        counts = pd.Series(dtype='int64')
+        rows = 0
+        for chunk in self.__chunks(usecols=['searchterm']):
+            counts = counts.add(chunk['searchterm'].value_counts(), fill_value=0)
+            rows += len(chunk)
+        counts = counts.astype('int64')
+        self._rows = rows
+        self._term_counts = counts
+        logger.debug(f"{len(counts)} distinct terms counted in {self.path}")
+        return counts
+
+    def columns(self) -> list[str]:
+        """Returns the column names of the file"""
+        if self._columns is None:
+            self._columns = list(pd.read_csv(self.path, nrows=0).columns)
+        return self._columns
+
+    def shape(self) -> tuple[int, int]:
+        """Returns the number of rows and columns of the file"""
+        if self._rows is None:
+            if self.backend == 'spark':
+                self._rows = self.__spark_df().count()
+            else:
+                self.__count_terms()
+        return self._rows, len(self.columns())
+
+    def head(self, n:int=5) -> pd.DataFrame:
+        """Returns the first n rows, reading only those"""
+        return pd.read_csv(self.path, nrows=n)
+
+    def dtypes(self) -> pd.Series:
+        """Returns the column types, inferred from the first chunk"""
+        return pd.read_csv(self.path, nrows=self.chunksize).dtypes
+
+    def count_containing(self, term:str) -> int:
+        """Returns how many searches contain term (case insensitive), like filter(lower(col).contains(term)).count()"""
+        term = term.lower()
+        if self.backend == 'spark':
+            from pyspark.sql.functions import col, lower
+            return self.__spark_df().filter(lower(col("searchterm")).contains(term)).count()
+        # matching the distinct terms is much cheaper than matching every row
+        counts = self.__count_terms()
+        matches = counts.index.astype(str).str.lower().str.contains(term, regex=False)
+        return int(counts[matches].sum())
+
+    def top_terms(self, k:int=5, exact:bool=True, capacity:int=1000) -> pd.Series:
+        """Returns the k most searched terms with their counts
+
+        Args:
+            - k (int): The number of terms to return
+            - exact (bool): If False, counts with a TopK sketch of capacity counters, for files with too many distinct terms to count exactly
+            - capacity (int): Number of counters of the sketch, must be >= k
+
+        Returns:
+            - pd.Series: The counts indexed by term, most searched first
+
+        Observations:
+            - With the spark backend the counting and the ranking run in Spark, only the k top terms reach the driver
+        """
+        if self.backend == 'spark':
+            from pyspark.sql.functions import desc
+            rows = self.__spark_df().groupBy('searchterm').count().orderBy(desc('count')).limit(k).collect()
+            return pd.Series([row['count'] for row in rows], index=[row['searchterm'] for row in rows], dtype='int64')
+        if exact:
+            return self.__count_terms().nlargest(k)
+        sketch = TopK(max(capacity, k))
+        for chunk in self.__chunks(usecols=['searchterm']):
+            sketch.update(chunk['searchterm'].value_counts())
+        logger.debug(f"top {k} terms of {self.path} within {sketch.error} of the true counts")
+        return sketch.top(k)
+
+
+class SalesForecastModel:
+
+    def __init__(self, intercept:float, coefficients:list[float], features:list[str]=None) -> None:
+        """Linear regression sales forecast, evaluated with numpy
+
+        Args:
+            - intercept (float): The intercept of the model
+            - coefficients (list[float]): One coefficient per feature
+            - features (list[str]): The feature columns, in order (the notebook's VectorAssembler uses ['year'])
+        """
+        self.intercept:float = float(intercept)
+        self.coefficients:np.ndarray = np.asarray(coefficients, dtype='float64')
+        self.features:list[str] = features or ['year']
+
+    @classmethod
+    def from_spark(cls, model) -> 'SalesForecastModel':
+        """Builds the model from a loaded pyspark.ml.regression.LinearRegressionModel"""
+        return cls(model.intercept, model.coefficients.toArray())
+
+    @classmethod
+    def load(cls, path:str) -> 'SalesForecastModel':
+        """Loads the coefficients saved by LinearRegressionModel.save() (or by to_json) without starting Spark
+
+        Args:
+            - path (str): The model directory (e.g. sales_prediction.model) or a JSON export
+
+        Observations:
+            - Reading the Spark directory needs pyarrow (or fastparquet) for its parquet data file
+        """
+        if os.path.isfile(path):
+            with open(path) as f:
+                data = json.load(f)
+            return cls(data['intercept'], data['coefficients'], data.get('features'))
+        data = pd.concat(pd.read_parquet(part) for part in sorted(glob.glob(os.path.join(path, 'data', '*.parquet'))))
+        row = data.iloc[0]
+        vector = row['coefficients']
+        if vector['type'] == 1:
+            coefficients = np.asarray(vector['values'], dtype='float64')
+        else:
+            # sparse vector
+            coefficients = np.zeros(vector['size'], dtype='float64')
+            coefficients[np.asarray(vector['indices'], dtype='int64')] = vector['values']
+        logger.debug(f"Sales forecast model loaded from {path}")
+        return cls(row['intercept'], coefficients)
+
+    def to_json(self, path:str) -> None:
+        """Saves the coefficients as JSON"""
+        with open(path, 'w') as f:
+            json.dump({'intercept': self.intercept, 'coefficients': self.coefficients.tolist(), 'features': self.features}, f)
+
+    def predict(self, years) -> np.ndarray:
+        """Predicts the sales of every year at once
+
+        Args:
+            - years: A year or a sequence of years (or an (n, features) array for multi feature models)
+
+        Returns:
+            - np.ndarray: One prediction per year
+        """
+        X = np.asarray(years, dtype='float64').reshape(-1, len(self.coefficients))
+        return X @ self.coefficients + self.intercept
@@ -1,50 +1,50 @@
 from datetime import timedelta
-import pandas as pd
+import json
 import os
-import re
 from airflow import DAG
+from airflow.exceptions import AirflowSkipException
+from airflow.models.param import Param
 from airflow.operators.bash import BashOperator
 from airflow.operators.python import PythonOperator
 from airflow.utils.dates import days_ago
+from extract import download
+from instrumentation import current_metrics, instrumented
+from log_index import LogIndex
+from weblog import merge_chunks, split_log_file, transform_chunk
 
-def parse_log_line(line):
-    """Parses a log line into a dictionary."""
-    pattern = r'(\d+\.\d+\.\d+\.\d+) - - \[(.*?)\] "(.*?)" (\d+) (\d+) "([^"]*)" "([^"]*)"'
-    match = re.match(pattern, line)
-    if match:
-        return {
-            'ip': match.group(1),
-            'timestamp': match.group(2),
-            'request': match.group(3),
-            'status': match.group(4),
-            'bytes': match.group(5),
-            'referer': match.group(6),
-            'user_agent': match.group(7)
-        }
-    else:
-        return None
-    
-def parse_log_file(filename):
-    """Parses a log file into a Pandas DataFrame."""
-    lines = []
-    with open(filename, 'r') as f:
-        for line in f:
-            parsed_line = parse_log_line(line.strip())
-            if parsed_line:
-                lines.append(parsed_line)
-    return pd.DataFrame(lines)
-
-def parse_log_file_ip_addr(filename, ip_addr):
-    """Parses a log file into a Pandas DataFrame."""
-    lines = []
-    with open(filename, 'r') as f:
-        for line in f:
-            parsed_line = parse_log_line(line.strip())
-            if parsed_line:
-                lines.append(parsed_line)
-    df = pd.DataFrame(lines)
-    df = df[df['ip'] == ip_addr]
-    df.to_csv(f'{current_path}/data/transformed_data.txt', index=False)
+LOG_URL = 'https://cf-courses-data.s3.us.cloud-object-storage.appdomain.cloud/IBM-DB0321EN-SkillsNetwork/ETL/accesslog.txt'
+
+def extract_log(url, output):
+    """Downloads the log, skipping the rest of the run when the source did not change since the last one."""
+    result = download(url, output)
+    if result['status'] == 'not_modified':
+        raise AirflowSkipException(f'{url} not modified since the last run')
+    return result
+
+def build_log_index(filename):
+    """Indexes the log by IP and precomputes its rollups, in one parse pass."""
+    LogIndex.build(filename)
+
+def write_log_report(filename, output, params):
+    """Writes the top-N rollups and the totals of params['ip_addrs'] from the index, without rescanning the log."""
+    index = LogIndex.load_fresh(filename)
+    report = index.report()
+    report['selected_ips'] = {ip: index.ip_totals(ip) for ip in params['ip_addrs']}
+    with current_metrics().timer('io'), open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    return output
+
+def split_log(filename, params):
+    """Splits the log into params['chunks'] line aligned byte ranges, one per mapped transform task."""
+    return split_log_file(filename, params['chunks'])
+
+def transform_log_chunk(filename, chunk, start, end, params):
+    """Keeps the lines of one chunk whose IP is in params['ip_addrs'], read through the index instead of rescanning the log.
+
+    The index comes from the upstream index task, the mapped workers never rebuild it concurrently.
+    """
+    index = LogIndex.load_fresh(filename)
+    return transform_chunk(filename, chunk, start, end, params['ip_addrs'], f'{current_path}/data', index=index)
 
 #defining DAG arguments
 default_args = {
@@ -63,23 +63,58 @@ process_web_log_dag = DAG(
     default_args=default_args,
     description='IBM Data Engineer Capstone Project - Data Pipeline',
     schedule_interval=timedelta(days=1),
+    params={
+        # IPs kept by the transform, override them when triggering the DAG
+        'ip_addrs': Param(['198.46.149.143'], type='array', items={'type': 'string'}, minItems=1),
+        # number of mapped transform tasks the downloaded log is split into
+        'chunks': Param(4, type='integer', minimum=1),
+    },
 )
 
 current_path = os.path.dirname(os.path.abspath(__file__))
 if not os.path.exists(f'{current_path}/data'):
     os.makedirs(f'{current_path}/data')
 
-extract = BashOperator(
+extract = PythonOperator(
     task_id='extract',
-    bash_command=f'curl https://cf-courses-data.s3.us.cloud-object-storage.appdomain.cloud/IBM-DB0321EN-SkillsNetwork/ETL/accesslog.txt \
-        > {current_path}/data/accesslog.txt',
+    python_callable=instrumented(output_dir=f'{current_path}/data')(extract_log),
+    op_args=[LOG_URL, f'{current_path}/data/accesslog.txt'],
+    dag=process_web_log_dag,
+)
+
+split = PythonOperator(
+    task_id='split',
+    python_callable=split_log,
+    op_args=[f'{current_path}/data/accesslog.txt'],
     dag=process_web_log_dag,
 )
 
-transform = PythonOperator(
+# one transform task per chunk, spread over the worker pool (the data folder must be shared by the workers)
+transform = PythonOperator.partial(
     task_id='transform',
-    python_callable=parse_log_file_ip_addr,
-    op_args=[f'{current_path}/data/accesslog.txt', '198.46.149.143'],
+    python_callable=instrumented(name='transform_chunk', output_dir=f'{current_path}/data')(transform_log_chunk),
+    op_args=[f'{current_path}/data/accesslog.txt'],
+    dag=process_web_log_dag,
+).expand(op_kwargs=split.output)
+
+merge = PythonOperator(
+    task_id='merge',
+    python_callable=instrumented(output_dir=f'{current_path}/data')(merge_chunks),
+    op_kwargs={'parts': transform.output, 'output': f'{current_path}/data/transformed_data.txt'},
+    dag=process_web_log_dag,
+)
+
+index = PythonOperator(
+    task_id='index',
+    python_callable=instrumented(output_dir=f'{current_path}/data')(build_log_index),
+    op_args=[f'{current_path}/data/accesslog.txt'],
+    dag=process_web_log_dag,
+)
+
+report = PythonOperator(
+    task_id='report',
+    python_callable=instrumented(output_dir=f'{current_path}/data')(write_log_report),
+    op_args=[f'{current_path}/data/accesslog.txt', f'{current_path}/data/report.json'],
     dag=process_web_log_dag,
 )
 
@@ -90,4 +125,5 @@ load = BashOperator(
 )
 
 # task pipeline
-extract >> transform >> load
\ No newline at end of file
+extract >> index >> split >> transform >> merge >> load
+index >> report
\ No newline at end of file
@@ -0,0 +1,278 @@
+"""Resumable, parallel HTTP download for the extract task.
+
+download() fetches a file with parallel range requests written straight into
+their place in ``<output>.tmp``, resumes interrupted parts on the next attempt,
+verifies a checksum and remembers the source's ETag/Last-Modified in
+``<output>.meta.json`` so an unchanged source is skipped with a conditional
+request. stream_lines() reads the source line by line instead, for parsing it
+without writing it to disk:
+
+    from weblog import parse_raw_lines
+    rows = parse_raw_lines(stream_lines(url))
+
+Only the standard library is used, any HTTP/1.1 server with Range support
+(S3, nginx, a local stand-in) works.
+"""
+import concurrent.futures
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from instrumentation import current_metrics
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+# below this size one range request is faster than coordinating parts (it still resumes)
+MIN_PART_SIZE = 8 << 20
+# seconds between two saves of the parts' progress, a killed run downloads again at most that much
+CHECKPOINT_INTERVAL = 1.0
+MD5_ETAG = re.compile(r'^"?([0-9a-fA-F]{32})"?$')
+
+
+class RangeNotHonoured(Exception):
+    """Raised when the server answers a range request with the full body (no Range support, or the source changed)."""
+
+
+def _open(url, headers=None, method='GET', timeout=60):
+    request = urllib.request.Request(url, headers=headers or {}, method=method)
+    return urllib.request.urlopen(request, timeout=timeout)
+
+
+def _load_state(output):
+    try:
+        with open(f'{output}.meta.json') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(output, state):
+    tmp = f'{output}.meta.json.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, f'{output}.meta.json')
+
+
+def probe(url, state=None, timeout=60):
+    """Sends a conditional HEAD request for url.
+
+    Args:
+        - url (str): The file to probe
+        - state (dict): The metadata saved by the previous download, for If-None-Match/If-Modified-Since
+        - timeout (int): Socket timeout in seconds
+
+    Returns:
+        - dict: 'not_modified', 'size', 'etag', 'last_modified' and 'ranges' (True if byte ranges are accepted)
+    """
+    state = state or {}
+    headers = {}
+    if state.get('url') == url:
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+    try:
+        with _open(url, headers, method='HEAD', timeout=timeout) as response:
+            length = response.headers.get('Content-Length')
+            info = {
+                'not_modified': False,
+                'size': int(length) if length is not None else None,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'ranges': response.headers.get('Accept-Ranges', '').lower() == 'bytes',
+            }
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return {'not_modified': True, 'size': state.get('size'), 'etag': state.get('etag'),
+                    'last_modified': state.get('last_modified'), 'ranges': False}
+        if e.code not in (403, 405, 501):
+            raise
+        # HEAD not allowed, fall back to a plain GET without conditional skip
+        return {'not_modified': False, 'size': None, 'etag': None, 'last_modified': None, 'ranges': False}
+    # servers ignoring conditional headers still give away an unchanged ETag
+    info['not_modified'] = bool(state.get('url') == url and info['etag'] and info['etag'] == state.get('etag'))
+    return info
+
+
+class _Progress:
+    """Bytes on disk of every part, saved to ``<output>.meta.json`` at most every CHECKPOINT_INTERVAL seconds."""
+
+    def __init__(self, output, state, partial, done):
+        self.output = output
+        self.state = state
+        self.partial = partial
+        self.done = done
+        self._lock = threading.Lock()
+        self._saved = time.monotonic()
+
+    def update(self, part, done):
+        with self._lock:
+            self.done[part] = done
+            if time.monotonic() - self._saved >= CHECKPOINT_INTERVAL:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        _save_state(self.output, {**self.state, 'partial': {**self.partial, 'done': list(self.done)}})
+        self._saved = time.monotonic()
+
+
+def _download_part(url, path, start, end, done, validator, timeout, on_block):
+    """Downloads bytes start + done..end (inclusive) of url into path, at their own offset.
+
+    on_block(done) is called with the bytes of the part on disk after every block.
+    """
+    if start + done > end:
+        return 0
+    headers = {'Range': f'bytes={start + done}-{end}'}
+    if validator:
+        # the server sends the whole file instead of the range if the source changed meanwhile
+        headers['If-Range'] = validator
+    received = 0
+    with _open(url, headers, timeout=timeout) as response:
+        if response.status != 206:
+            raise RangeNotHonoured(f'{url} answered {response.status} to a range request')
+        with open(path, 'r+b') as f:
+            f.seek(start + done)
+            while block := response.read(CHUNK_SIZE):
+                f.write(block)
+                # flushed before it is counted, the saved progress never runs ahead of the file
+                f.flush()
+                received += len(block)
+                on_block(done + received)
+    return received
+
+
+def _download_single(url, path, timeout):
+    """Downloads url into path in one stream, from the start."""
+    received = 0
+    with _open(url, timeout=timeout) as response, open(path, 'wb') as f:
+        while block := response.read(CHUNK_SIZE):
+            f.write(block)
+            received += len(block)
+    return received
+
+
+def _hash_file(path):
+    sha256 = hashlib.sha256()
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        while block := f.read(CHUNK_SIZE):
+            sha256.update(block)
+            md5.update(block)
+    return sha256.hexdigest(), md5.hexdigest()
+
+
+def download(url, output, parts=4, expected_sha256=None, timeout=60):
+    """Downloads url into output with parallel range requests.
+
+    Args:
+        - url (str): The file to download
+        - output (str): Where to write it
+        - parts (int): Number of concurrent range requests
+        - expected_sha256 (str): Checksum the download must match, defaults to the ETag when it is a plain MD5 (S3)
+        - timeout (int): Socket timeout in seconds
+
+    Returns:
+        - dict: 'status' ('downloaded' or 'not_modified'), 'path', 'size', 'sha256', 'etag', 'parts'
+          and 'received' (bytes transferred by this call)
+
+    Raises:
+        - ValueError: If the downloaded file does not match its checksum or size
+
+    Observations:
+        - Every part writes at its own offset of a preallocated <output>.tmp, there is no concatenation step
+        - The progress of the parts is saved in <output>.meta.json, a failed run resumes them with range requests
+        - Files below MIN_PART_SIZE are fetched as a single part, they resume the same way
+        - Progress from an older version of the source (different ETag/size) is discarded
+        - Servers without range support or Content-Length are read in a single stream, which restarts from zero
+        - The output is replaced atomically, readers never see a half written file
+    """
+    metrics = current_metrics()
+    state = _load_state(output)
+    info = probe(url, state, timeout)
+    if info['not_modified'] and os.path.exists(output):
+        logger.info('%s not modified since %s, skipping download', url, state.get('last_modified') or state.get('etag'))
+        return {'status': 'not_modified', 'path': output, 'size': state.get('size'), 'sha256': state.get('sha256'),
+                'etag': state.get('etag'), 'parts': 0, 'received': 0}
+
+    size = info['size']
+    ranged = info['ranges'] and size is not None
+    count = max(parts, 1) if ranged and size >= MIN_PART_SIZE else 1
+    version = {'url': url, 'etag': info['etag'], 'last_modified': info['last_modified'], 'size': size}
+    partial = {**version, 'parts': count}
+    previous = state.get('partial') or {}
+    state = {k: v for k, v in state.items() if k != 'partial'}
+    tmp = f'{output}.tmp'
+
+    received = 0
+    with metrics.timer('io'):
+        if ranged:
+            resumable = {k: previous.get(k) for k in partial} == partial and len(previous.get('done') or []) == count
+            if resumable and os.path.exists(tmp) and os.path.getsize(tmp) == size:
+                done = list(previous['done'])
+                logger.info('resuming %s, %d of %d bytes already downloaded', url, sum(done), size)
+            else:
+                done = [0] * count
+                with open(tmp, 'wb') as f:
+                    f.truncate(size)
+            progress = _Progress(output, state, partial, done)
+            progress.save()
+            bounds = [size * i // count for i in range(count + 1)]
+            validator = info['etag'] or info['last_modified']
+            try:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=count) as pool:
+                    futures = [
+                        pool.submit(_download_part, url, tmp, bounds[i], bounds[i + 1] - 1, done[i], validator, timeout,
+                                    functools.partial(progress.update, i))
+                        for i in range(count)
+                    ]
+                    received = sum(future.result() for future in futures)
+            except RangeNotHonoured as e:
+                logger.warning('%s, downloading in a single stream', e)
+                ranged = False
+            finally:
+                progress.save()
+        if not ranged:
+            _save_state(output, state)
+            count = 1
+            received = _download_single(url, tmp, timeout)
+        sha256, md5 = _hash_file(tmp)
+        written = os.path.getsize(tmp)
+
+    try:
+        if size is not None and written != size:
+            raise ValueError(f'{url}: expected {size} bytes, got {written}')
+        etag_md5 = MD5_ETAG.match(info['etag'] or '')
+        if expected_sha256 is not None and sha256 != expected_sha256.lower():
+            raise ValueError(f'{url}: sha256 {sha256} does not match {expected_sha256}')
+        if expected_sha256 is None and etag_md5 and md5 != etag_md5.group(1).lower():
+            raise ValueError(f'{url}: md5 {md5} does not match ETag {info["etag"]}')
+    except ValueError:
+        os.remove(tmp)
+        _save_state(output, state)
+        raise
+    os.replace(tmp, output)
+    _save_state(output, {**version, 'sha256': sha256, 'md5': md5})
+
+    metrics.bytes_read += received
+    metrics.bytes_written += received
+    logger.info('downloaded %s (%d bytes, %d parts, %d bytes transferred this run)', url, written, count, received)
+    return {'status': 'downloaded', 'path': output, 'size': written, 'sha256': sha256,
+            'etag': info['etag'], 'parts': count, 'received': received}
+
+
+def stream_lines(url, timeout=60):
+    """Yields the lines (bytes) of url as they arrive, without writing the file to disk."""
+    with _open(url, timeout=timeout) as response:
+        yield from response
@@ -0,0 +1,206 @@
+"""Per-run metrics and optional profiling for the pipeline's transform callables.
+
+Works the same from a PythonOperator and from a standalone script:
+
+    @instrumented(output_dir='data')
+    def transform(filename):
+        metrics = current_metrics()
+        with metrics.timer('pandas'):
+            ...
+
+    with track('automation') as metrics:
+        metrics.rows_in += len(records)
+
+The summary is logged, written as ``<name>.metrics.json`` to ``output_dir`` and,
+inside an Airflow task, pushed to XCom under the ``metrics`` key. Setting
+``profile`` (or the ``PIPELINE_PROFILE`` environment variable) to ``cprofile``
+or ``pyinstrument`` also saves a profile of the run next to the output.
+"""
+import contextlib
+import contextvars
+import cProfile
+import datetime
+import functools
+import json
+import logging
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+_current:contextvars.ContextVar = contextvars.ContextVar('pipeline_metrics', default=None)
+
+
+def peak_rss() -> int | None:
+    """Returns the peak resident set size of this process in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _task_instance():
+    """Returns the running Airflow TaskInstance, or None outside of a task."""
+    try:
+        from airflow.operators.python import get_current_context
+        return get_current_context()['ti']
+    except Exception:
+        return None
+
+
+class RunMetrics:
+    """Counters and timings of one transform run.
+
+    Observations:
+        - Time is split in three buckets: 'regex' (log line matching), 'pandas' (DataFrame work)
+          and 'io' (reading and writing files). Whatever is left of the wall time is reported as 'other'
+        - The peak memory is the process high-water mark, Airflow runs every task in its own process
+    """
+
+    def __init__(self, name:str) -> None:
+        self.name:str = name
+        self.rows_in:int = 0
+        self.rows_out:int = 0
+        self.bytes_read:int = 0
+        self.bytes_written:int = 0
+        self.timings:dict[str, float] = {'regex': 0.0, 'pandas': 0.0, 'io': 0.0}
+        self.started:float | None = None
+        self.finished:float | None = None
+
+    @contextlib.contextmanager
+    def timer(self, category:str):
+        """Adds the time spent in the wrapped block to ``category``."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(category, time.perf_counter() - start)
+
+    def add_time(self, category:str, seconds:float) -> None:
+        """Adds ``seconds`` to ``category``, for hot loops where a context manager per item is too costly."""
+        self.timings[category] = self.timings.get(category, 0.0) + seconds
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+    def summary(self) -> dict:
+        """Returns the run metrics as a JSON serializable dictionary."""
+        end = self.finished if self.finished is not None else time.perf_counter()
+        wall = end - self.started if self.started is not None else sum(self.timings.values())
+        timings = {f'{k}_s': round(v, 6) for k, v in self.timings.items()}
+        return {
+            'name': self.name,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'wall_s': round(wall, 6),
+            **timings,
+            'other_s': round(max(wall - sum(self.timings.values()), 0.0), 6),
+            'parse_rate_rows_s': round(self.rows_in / wall, 2) if wall > 0 else None,
+            'peak_rss_bytes': peak_rss(),
+        }
+
+
+def current_metrics() -> RunMetrics:
+    """Returns the metrics of the active run, or a throwaway instance when nothing is being tracked."""
+    metrics = _current.get()
+    return metrics if metrics is not None else RunMetrics('untracked')
+
+
+def _start_profiler(profile:str):
+    if profile == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if profile == 'pyinstrument':
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        return profiler
+    raise ValueError(f'Invalid profiler: {profile}. Must be one of {PROFILERS}')
+
+
+def _save_profiler(profiler, profile:str, basename:str) -> str:
+    if profile == 'cprofile':
+        profiler.disable()
+        path = f'{basename}.prof'
+        profiler.dump_stats(path)
+    else:
+        profiler.stop()
+        path = f'{basename}.html'
+        with open(path, 'w') as f:
+            f.write(profiler.output_html())
+    return path
+
+
+@contextlib.contextmanager
+def track(name:str, profile:str | None = None, output_dir:str | None = None):
+    """Tracks a run: yields its :class:`RunMetrics` and reports them on exit.
+
+    Args:
+        - name (str): Name of the run, used in the logs and file names
+        - profile (str): 'cprofile' or 'pyinstrument' to profile the run, defaults to $PIPELINE_PROFILE
+        - output_dir (str): Directory the profile and the metrics JSON are written to
+
+    Observations:
+        - Inside an Airflow task the name gets the task id and map index, and the summary is pushed to XCom
+        - Metrics are reported even when the run raises, so failed runs can be diagnosed too
+    """
+    profile = profile or os.environ.get('PIPELINE_PROFILE') or None
+    if profile is not None and profile not in PROFILERS:
+        raise ValueError(f'Invalid profiler: {profile}. Must be one of {PROFILERS}')
+
+    ti = _task_instance()
+    if ti is not None:
+        name = f'{ti.task_id}_{ti.map_index}' if getattr(ti, 'map_index', -1) >= 0 else ti.task_id
+    metrics = RunMetrics(name)
+    # started first: a profiler failing to start must not leave the metrics set as current
+    profiler = _start_profiler(profile) if profile else None
+    token = _current.set(metrics)
+    metrics.start()
+    try:
+        yield metrics
+    finally:
+        metrics.stop()
+        _current.reset(token)
+        summary = metrics.summary()
+        if output_dir is not None or profiler is not None:
+            output_dir = output_dir or os.getcwd()
+            os.makedirs(output_dir, exist_ok=True)
+            stamp = datetime.datetime.now().strftime('%Y%m%dT%H%M%S')
+            basename = os.path.join(output_dir, f'{name}_{stamp}')
+            if profiler is not None:
+                summary['profile'] = _save_profiler(profiler, profile, basename)
+            with open(f'{basename}.metrics.json', 'w') as f:
+                json.dump(summary, f, indent=2)
+        logger.info('metrics %s: %s', name, json.dumps(summary))
+        if ti is not None:
+            ti.xcom_push(key='metrics', value=summary)
+
+
+def instrumented(name:str | None = None, profile:str | None = None, output_dir:str | None = None):
+    """Decorator running the wrapped callable inside :func:`track`.
+
+    The wrapper keeps the callable's signature, so a PythonOperator keeps passing
+    only the arguments the original function asks for.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(name or func.__name__, profile=profile, output_dir=output_dir):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
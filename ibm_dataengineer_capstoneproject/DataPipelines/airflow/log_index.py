@@ -0,0 +1,296 @@
+"""On-disk index and rollups of the web server access log.
+
+One parse pass over accesslog.txt builds, in ``accesslog.txt.idx/``:
+
+    - offsets.npy: the byte offset of every valid line, grouped by IP and sorted within each IP
+    - index.json: per IP the slice of offsets.npy plus its request and byte totals, the status
+      histogram, the top request paths and user agents (heavy-hitter sketches) and the size/mtime
+      of the log the index was built from
+
+Per-IP extractions (the DAG's transform included) then seek straight to the matching lines and top-N questions are answered
+from index.json, neither rescans the log:
+
+    index = LogIndex.load_or_build('data/accesslog.txt')
+    index.rows('198.46.149.143')
+    index.top_paths(10)
+"""
+import argparse
+import array
+import heapq
+import json
+import os
+import sys
+import time
+import numpy as np
+from instrumentation import current_metrics
+from weblog import parse_log_line
+
+INDEX_VERSION = 1
+
+
+class HeavyHitters:
+    """Bounded-memory frequent items sketch (Misra-Gries, batched decrements).
+
+    Keeps at most 2 * capacity counters. Every reported count is a lower bound of
+    the true count and at most ``error`` below it, any item seen more than
+    total / capacity times is guaranteed to be reported.
+    """
+
+    def __init__(self, capacity:int=1000) -> None:
+        self.capacity = capacity
+        self.counts:dict[str, int] = {}
+        self.error = 0
+        self.total = 0
+
+    def add(self, key:str, weight:int=1) -> None:
+        self.total += weight
+        self.counts[key] = self.counts.get(key, 0) + weight
+        if len(self.counts) > 2 * self.capacity:
+            self._shrink()
+
+    def _shrink(self) -> None:
+        # subtracting the capacity-th largest count keeps at most capacity counters, amortized O(1) per add
+        threshold = heapq.nlargest(self.capacity, self.counts.values())[-1]
+        self.error += threshold
+        self.counts = {k: c - threshold for k, c in self.counts.items() if c > threshold}
+
+    def top(self, n:int) -> list[tuple[str, int]]:
+        return heapq.nlargest(n, self.counts.items(), key=lambda item: item[1])
+
+    def to_dict(self) -> dict:
+        return {'capacity': self.capacity, 'error': self.error, 'total': self.total, 'top': self.top(self.capacity)}
+
+
+def _request_path(request:str) -> str:
+    """Returns the path of a request line like 'GET /index.html HTTP/1.1'."""
+    parts = request.split(' ')
+    return parts[1] if len(parts) > 1 else request
+
+
+def _fingerprint(log_path:str) -> dict:
+    stat = os.stat(log_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class LogIndex:
+    """Read side of the index built by :meth:`LogIndex.build`."""
+
+    def __init__(self, log_path:str, index_dir:str, meta:dict, offsets:np.ndarray) -> None:
+        self.log_path = log_path
+        self.index_dir = index_dir
+        self.meta = meta
+        self.offsets = offsets
+
+    @staticmethod
+    def default_dir(log_path:str) -> str:
+        return f'{log_path}.idx'
+
+    @classmethod
+    def build(cls, log_path:str, index_dir:str=None, sketch_capacity:int=1000) -> 'LogIndex':
+        """Parses log_path once and writes its index to index_dir (default: <log_path>.idx).
+
+        Args:
+            - log_path (str): The access log to index
+            - index_dir (str): Where to write the index
+            - sketch_capacity (int): Number of counters of the top paths/user agents sketches
+
+        Returns:
+            - LogIndex: The freshly built index
+        """
+        index_dir = index_dir or cls.default_dir(log_path)
+        metrics = current_metrics()
+        fingerprint = _fingerprint(log_path)
+        by_ip:dict[str, array.array] = {}
+        requests:dict[str, int] = {}
+        sent:dict[str, int] = {}
+        status:dict[str, int] = {}
+        paths = HeavyHitters(sketch_capacity)
+        user_agents = HeavyHitters(sketch_capacity)
+        rows = 0
+        position = 0
+        regex_time = 0.0
+        loop_start = time.perf_counter()
+        with open(log_path, 'rb') as f:
+            for raw in f:
+                offset = position
+                position += len(raw)
+                metrics.rows_in += 1
+                t = time.perf_counter()
+                parsed = parse_log_line(raw.decode('utf-8', errors='replace').strip())
+                regex_time += time.perf_counter() - t
+                if parsed is None:
+                    continue
+                rows += 1
+                ip = parsed['ip']
+                if ip not in by_ip:
+                    by_ip[ip] = array.array('Q')
+                    requests[ip] = 0
+                    sent[ip] = 0
+                # lines are read in file order, so every IP's offsets come out sorted
+                by_ip[ip].append(offset)
+                requests[ip] += 1
+                sent[ip] += int(parsed['bytes'])
+                status[parsed['status']] = status.get(parsed['status'], 0) + 1
+                paths.add(_request_path(parsed['request']))
+                user_agents.add(parsed['user_agent'])
+        metrics.add_time('regex', regex_time)
+        metrics.add_time('io', time.perf_counter() - loop_start - regex_time)
+        metrics.bytes_read += position
+
+        with metrics.timer('io'):
+            os.makedirs(index_dir, exist_ok=True)
+            # index.json is removed first and written last, a crash midway leaves no index rather than a wrong one
+            if os.path.exists(os.path.join(index_dir, 'index.json')):
+                os.remove(os.path.join(index_dir, 'index.json'))
+            offsets = np.empty(rows, dtype=np.uint64)
+            ips = {}
+            start = 0
+            for ip, ip_offsets in by_ip.items():
+                stop = start + len(ip_offsets)
+                offsets[start:stop] = np.frombuffer(ip_offsets, dtype=np.uint64)
+                ips[ip] = [start, stop, requests[ip], sent[ip]]
+                start = stop
+            np.save(os.path.join(index_dir, 'offsets.npy'), offsets)
+            meta = {
+                'version': INDEX_VERSION,
+                'source': fingerprint,
+                'rows': rows,
+                'ips': ips,
+                'status': dict(sorted(status.items())),
+                'paths': paths.to_dict(),
+                'user_agents': user_agents.to_dict(),
+            }
+            tmp = os.path.join(index_dir, 'index.json.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp, os.path.join(index_dir, 'index.json'))
+            metrics.bytes_written += offsets.nbytes + os.path.getsize(os.path.join(index_dir, 'index.json'))
+        metrics.rows_out += rows
+        return cls(log_path, index_dir, meta, offsets)
+
+    @classmethod
+    def load(cls, log_path:str, index_dir:str=None) -> 'LogIndex':
+        """Opens an existing index, offsets are memory mapped.
+
+        Raises:
+            - FileNotFoundError: If there is no index in index_dir
+        """
+        index_dir = index_dir or cls.default_dir(log_path)
+        with open(os.path.join(index_dir, 'index.json')) as f:
+            meta = json.load(f)
+        offsets = np.load(os.path.join(index_dir, 'offsets.npy'), mmap_mode='r')
+        return cls(log_path, index_dir, meta, offsets)
+
+    @classmethod
+    def load_fresh(cls, log_path:str, index_dir:str=None) -> 'LogIndex':
+        """Opens an existing index that must match the current log, for readers that must not rebuild it.
+
+        Raises:
+            - FileNotFoundError: If there is no index in index_dir
+            - ValueError: If the log changed since the index was built
+        """
+        index = cls.load(log_path, index_dir)
+        if not index.is_fresh():
+            raise ValueError(f'The index of {log_path} is older than the log, it must be rebuilt first')
+        return index
+
+    @classmethod
+    def load_or_build(cls, log_path:str, index_dir:str=None) -> 'LogIndex':
+        """Opens the index of log_path, rebuilding it when it is missing or older than the log."""
+        try:
+            index = cls.load(log_path, index_dir)
+            if index.is_fresh():
+                return index
+        except (FileNotFoundError, ValueError):
+            pass
+        return cls.build(log_path, index_dir)
+
+    def is_fresh(self) -> bool:
+        """Returns True if the log did not change since the index was built."""
+        return self.meta.get('version') == INDEX_VERSION and self.meta.get('source') == _fingerprint(self.log_path)
+
+    def ip_offsets(self, ip:str) -> np.ndarray:
+        """Returns the sorted byte offsets of the lines of ip."""
+        if ip not in self.meta['ips']:
+            return self.offsets[0:0]
+        start, stop = self.meta['ips'][ip][:2]
+        return self.offsets[start:stop]
+
+    def select(self, ips:list[str], start:int=0, end:int=None) -> np.ndarray:
+        """Returns the sorted byte offsets of the lines of ips that begin within [start, end)."""
+        selected = []
+        for ip in dict.fromkeys(ips):
+            offsets = self.ip_offsets(ip)
+            lo, hi = np.searchsorted(offsets, [start, end if end is not None else np.iinfo(np.uint64).max])
+            selected.append(offsets[lo:hi])
+        return np.sort(np.concatenate(selected)) if selected else self.offsets[0:0]
+
+    def read(self, offsets:np.ndarray):
+        """Yields the raw lines at offsets, reading only those lines from the log."""
+        metrics = current_metrics()
+        with open(self.log_path, 'rb') as f:
+            for offset in offsets:
+                f.seek(int(offset))
+                raw = f.readline()
+                metrics.bytes_read += len(raw)
+                yield raw
+
+    def lines(self, ip:str):
+        """Yields the raw lines of ip, reading only those lines from the log."""
+        return self.read(self.ip_offsets(ip))
+
+    def rows(self, ip:str) -> list[dict]:
+        """Returns the parsed lines of ip."""
+        return [parse_log_line(raw.decode('utf-8', errors='replace').strip()) for raw in self.lines(ip)]
+
+    def top_ips(self, n:int=10, by:str='requests') -> list[tuple[str, int]]:
+        """Returns the n IPs with the most 'requests' or 'bytes'."""
+        if by not in ('requests', 'bytes'):
+            raise ValueError(f'Invalid ranking: {by}. Must be either requests or bytes')
+        column = 2 if by == 'requests' else 3
+        return heapq.nlargest(n, ((ip, v[column]) for ip, v in self.meta['ips'].items()), key=lambda item: item[1])
+
+    def ip_totals(self, ip:str) -> dict:
+        """Returns the requests and bytes of ip."""
+        _, _, requests, sent = self.meta['ips'].get(ip, [0, 0, 0, 0])
+        return {'requests': requests, 'bytes': sent}
+
+    def status_histogram(self) -> dict[str, int]:
+        return dict(self.meta['status'])
+
+    def top_paths(self, n:int=10) -> list[tuple[str, int]]:
+        """Returns the n most requested paths, counts are lower bounds (see HeavyHitters)."""
+        return [tuple(item) for item in self.meta['paths']['top'][:n]]
+
+    def top_user_agents(self, n:int=10) -> list[tuple[str, int]]:
+        """Returns the n most frequent user agents, counts are lower bounds (see HeavyHitters)."""
+        return [tuple(item) for item in self.meta['user_agents']['top'][:n]]
+
+    def report(self, n:int=10) -> dict:
+        """Returns the rollups as a JSON serializable dictionary."""
+        return {
+            'rows': self.meta['rows'],
+            'ips': len(self.meta['ips']),
+            'top_ips_by_requests': self.top_ips(n, 'requests'),
+            'top_ips_by_bytes': self.top_ips(n, 'bytes'),
+            'status': self.status_histogram(),
+            'top_paths': self.top_paths(n),
+            'top_user_agents': self.top_user_agents(n),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Query the access log through its index')
+    parser.add_argument('log', help='path of accesslog.txt')
+    parser.add_argument('--ip', action='append', default=[], help='print the lines of this IP (repeatable)')
+    parser.add_argument('--top', type=int, default=10, help='size of the top-N lists')
+    parser.add_argument('--rebuild', action='store_true', help='rebuild the index even if it is fresh')
+    args = parser.parse_args()
+
+    index = LogIndex.build(args.log) if args.rebuild else LogIndex.load_or_build(args.log)
+    if args.ip:
+        for ip in args.ip:
+            for raw in index.lines(ip):
+                sys.stdout.write(raw.decode('utf-8', errors='replace'))
+    else:
+        print(json.dumps(index.report(args.top), indent=2))
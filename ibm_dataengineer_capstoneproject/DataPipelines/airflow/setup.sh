@@ -4,6 +4,6 @@ docker compose up airflow-init
 docker compose up
 
 # submit a dag
-# docker cp dag.py airflow-airflow-webserver-1:/opt/airflow/dags 
+# for f in dag.py instrumentation.py extract.py weblog.py log_index.py; do docker cp $f airflow-airflow-webserver-1:/opt/airflow/dags; done
 # docker exec airflow-airflow-webserver-1 ls /opt/airflow/dags/data
 # docker exec airflow-airflow-webserver-1 cat /opt/airflow/dags/data/transformed_data.txt
\ No newline at end of file
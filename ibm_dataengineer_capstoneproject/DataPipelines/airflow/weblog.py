@@ -0,0 +1,135 @@
+"""Parsing and chunked transform of the web server access log (combined log format).
+
+Kept free of Airflow imports so the DAG's transform steps can be run and tested on their own.
+"""
+import os
+import re
+import shutil
+import time
+import pandas as pd
+from instrumentation import current_metrics
+
+LOG_PATTERN = re.compile(r'(\d+\.\d+\.\d+\.\d+) - - \[(.*?)\] "(.*?)" (\d+) (\d+) "([^"]*)" "([^"]*)"')
+LOG_COLUMNS = ['ip', 'timestamp', 'request', 'status', 'bytes', 'referer', 'user_agent']
+
+def parse_log_line(line):
+    """Parses a log line into a dictionary."""
+    match = LOG_PATTERN.match(line)
+    if match:
+        return {
+            'ip': match.group(1),
+            'timestamp': match.group(2),
+            'request': match.group(3),
+            'status': match.group(4),
+            'bytes': match.group(5),
+            'referer': match.group(6),
+            'user_agent': match.group(7)
+        }
+    else:
+        return None
+
+def read_log_lines(filename, start=0, end=None):
+    """Yields the raw lines of a log file.
+
+    With start/end only the lines beginning in that byte range are read, the range
+    boundaries are expected to fall right after a newline (see split_log_file).
+    """
+    position = start
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        for raw in f:
+            if end is not None and position >= end:
+                break
+            position += len(raw)
+            yield raw
+
+def parse_raw_lines(raw_lines):
+    """Parses an iterable of raw (bytes) log lines, recording the time spent in regex vs reading them.
+
+    The lines can come from a file (read_log_lines) or straight from the network (extract.stream_lines).
+    """
+    metrics = current_metrics()
+    lines = []
+    regex_time = 0.0
+    io_start = time.perf_counter()
+    for raw in raw_lines:
+        metrics.rows_in += 1
+        metrics.bytes_read += len(raw)
+        t = time.perf_counter()
+        parsed_line = parse_log_line(raw.decode('utf-8', errors='replace').strip())
+        regex_time += time.perf_counter() - t
+        if parsed_line:
+            lines.append(parsed_line)
+    metrics.add_time('regex', regex_time)
+    metrics.add_time('io', time.perf_counter() - io_start - regex_time)
+    return lines
+
+def parse_log_lines(filename, start=0, end=None):
+    """Parses every valid line of a log file, or of the given byte range of it."""
+    return parse_raw_lines(read_log_lines(filename, start, end))
+
+def parse_log_file(filename, start=0, end=None):
+    """Parses a log file into a Pandas DataFrame."""
+    lines = parse_log_lines(filename, start, end)
+    with current_metrics().timer('pandas'):
+        return pd.DataFrame(lines, columns=LOG_COLUMNS)
+
+def write_transformed(df, output):
+    """Writes the transformed rows to output as CSV."""
+    metrics = current_metrics()
+    with metrics.timer('io'):
+        df.to_csv(output, index=False)
+    metrics.rows_out += len(df)
+    metrics.bytes_written += os.path.getsize(output)
+    return output
+
+def split_log_file(filename, chunks):
+    """Splits a log file into at most chunks byte ranges aligned on line boundaries.
+
+    Returns one {'chunk', 'start', 'end'} dictionary per non empty range (a single empty one for an
+    empty file), to be expanded into mapped transform tasks.
+    """
+    size = os.path.getsize(filename)
+    chunks = max(1, min(chunks, size or 1))
+    boundaries = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, chunks):
+            f.seek(size * i // chunks)
+            f.readline()
+            boundaries.append(min(f.tell(), size))
+    boundaries.append(size)
+    boundaries = sorted(set(boundaries))
+    return [
+        {'chunk': i, 'start': start, 'end': end}
+        for i, (start, end) in enumerate(zip(boundaries, boundaries[1:]))
+    ] or [{'chunk': 0, 'start': 0, 'end': 0}]
+
+def transform_chunk(filename, chunk, start, end, ip_addrs, output_dir, index=None):
+    """Keeps the lines of one chunk whose IP is in ip_addrs, returns the partial CSV path.
+
+    With an index (log_index.LogIndex of filename) only the lines of ip_addrs are read and parsed,
+    instead of the whole byte range.
+    """
+    if index is not None:
+        lines = parse_raw_lines(index.read(index.select(ip_addrs, start, end)))
+    else:
+        lines = parse_log_lines(filename, start, end)
+    with current_metrics().timer('pandas'):
+        df = pd.DataFrame(lines, columns=LOG_COLUMNS)
+        df = df[df['ip'].isin(ip_addrs)]
+    return write_transformed(df, os.path.join(output_dir, f'transformed_data.part{chunk}.txt'))
+
+def merge_chunks(parts, output):
+    """Concatenates the partial CSVs, in chunk order, into output and removes them."""
+    metrics = current_metrics()
+    with metrics.timer('io'), open(output, 'wb') as out:
+        for i, part in enumerate(parts):
+            with open(part, 'rb') as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out)
+            metrics.bytes_read += os.path.getsize(part)
+            os.remove(part)
+    metrics.bytes_written += os.path.getsize(output)
+    return output
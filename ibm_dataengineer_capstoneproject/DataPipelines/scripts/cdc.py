@@ -0,0 +1,269 @@
+# Change data capture from the MySQL staging database to the PostgreSQL warehouse.
+#
+# Instead of polling MAX(rowid) (automation.py), this script follows every insert, update and
+# delete of sales_data and applies them to the warehouse in batches:
+#   - binlog source: tails the MySQL row based binlog, nothing is added to the OLTP database.
+#     Needs the `cdc` extra (`poetry install -E cdc`) and the binlog settings of OLTP_Db/docker-compose.mysql.yml
+#   - changelog source: reads the sales_data_changelog table filled by the triggers of cdc_changelog.sql
+#
+# Each batch is applied as one bulk upsert plus one bulk delete, in the same PostgreSQL transaction
+# as the saved source position (table cdc_position). The changelog source deletes the applied rows
+# afterwards, a crash in between replays that batch, which upserts and deletes by rowid make harmless.
+# The first run of a source is its initial load: it takes the source's starting point (the binlog
+# position, or the changelog triggers already in place) before copying sales_data, so nothing written
+# meanwhile is missed, and the copy resumes where it stopped if interrupted.
+#
+#   python cdc.py --source binlog
+#   python cdc.py --source changelog --once
+
+import argparse
+import datetime
+import random
+import time
+import psycopg2
+import pymysql
+from psycopg2.extras import Json, execute_values
+
+MYSQL = {'host': 'localhost', 'port': 3306, 'user': 'root', 'password': 'root', 'database': 'sales'}
+PGSQL = {'host': 'localhost', 'port': '5432', 'user': 'root', 'password': 'root', 'database': 'sales'}
+TABLE = 'sales_data'
+CHANGELOG = 'sales_data_changelog'
+
+POSITION_DDL = """CREATE TABLE IF NOT EXISTS cdc_position(
+source VARCHAR(64) PRIMARY KEY NOT NULL,
+position JSONB NOT NULL,
+updated_at TIMESTAMP NOT NULL
+)"""
+
+# price and timestamp are not in the staging table, they are filled like automation.insert_records does
+UPSERT_SQL = """INSERT INTO sales(rowid,product_id,customer_id,price,quantity,timestamp) VALUES %s
+ON CONFLICT (rowid) DO UPDATE SET
+product_id = EXCLUDED.product_id,
+customer_id = EXCLUDED.customer_id,
+quantity = EXCLUDED.quantity"""
+
+
+class ChangeBatch:
+    """Changes of one batch collapsed per rowid, the last change of a row wins.
+
+    A snapshot batch also sets replaces = (after, last): the rows it upserts are the whole staging
+    content of rowid range (after, last], None meaning unbounded.
+    """
+
+    def __init__(self, replaces=None):
+        self.upserts = {}
+        self.deletes = set()
+        self.events = 0
+        self.replaces = replaces
+
+    def upsert(self, row):
+        self.deletes.discard(row['rowid'])
+        self.upserts[row['rowid']] = row
+        self.events += 1
+
+    def delete(self, rowid):
+        self.upserts.pop(rowid, None)
+        self.deletes.add(rowid)
+        self.events += 1
+
+    def __len__(self):
+        return self.events
+
+
+def load_position(pgsql_conn, source):
+    """Returns the last applied position of source, or None on the first run."""
+    with pgsql_conn, pgsql_conn.cursor() as cursor:
+        cursor.execute(POSITION_DDL)
+        cursor.execute('SELECT position FROM cdc_position WHERE source = %s', (source,))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def apply_batch(pgsql_conn, batch, source, position):
+    """Applies batch and saves position in one transaction."""
+    now = datetime.datetime.now()
+    with pgsql_conn, pgsql_conn.cursor() as cursor:
+        if batch.replaces is not None:
+            # warehouse rows of the copied range that are no longer in staging
+            after, last = batch.replaces
+            cursor.execute(
+                """DELETE FROM sales WHERE (%(after)s IS NULL OR rowid > %(after)s)
+                AND (%(last)s IS NULL OR rowid <= %(last)s) AND rowid <> ALL(%(rowids)s)""",
+                {'after': after, 'last': last, 'rowids': list(batch.upserts)},
+            )
+        if batch.deletes:
+            cursor.execute('DELETE FROM sales WHERE rowid = ANY(%s)', (list(batch.deletes),))
+        if batch.upserts:
+            execute_values(cursor, UPSERT_SQL, [
+                (row['rowid'], row['product_id'], row['customer_id'], random.randrange(1, 5000), row['quantity'], now)
+                for row in batch.upserts.values()
+            ], page_size=1000)
+        cursor.execute(
+            """INSERT INTO cdc_position(source, position, updated_at) VALUES (%s, %s, %s)
+            ON CONFLICT (source) DO UPDATE SET position = EXCLUDED.position, updated_at = EXCLUDED.updated_at""",
+            (source, Json(position), now),
+        )
+
+
+def snapshot_batches(position, batch_size):
+    """Yields (batch, position) copying sales_data in rowid order, the initial load of a source.
+
+    position['snapshot_after'] holds the last copied rowid (None before the first page), an interrupted
+    copy resumes after it. The last position yielded drops the key: the snapshot is done. Rows changed
+    while copying are replayed by the source afterwards, on top of the copy.
+    """
+    after = position['snapshot_after']
+    conn = pymysql.connect(**MYSQL, cursorclass=pymysql.cursors.DictCursor)
+    try:
+        while True:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"""SELECT rowid, product_id, customer_id, quantity FROM {TABLE}
+                    WHERE %(after)s IS NULL OR rowid > %(after)s ORDER BY rowid LIMIT %(limit)s""",
+                    {'after': after, 'limit': batch_size},
+                )
+                rows = cursor.fetchall()
+            conn.commit()
+            if not rows:
+                break
+            batch = ChangeBatch(replaces=(after, rows[-1]['rowid']))
+            for row in rows:
+                batch.upsert(row)
+            after = rows[-1]['rowid']
+            yield batch, {**position, 'snapshot_after': after}
+    finally:
+        conn.close()
+    yield ChangeBatch(replaces=(after, None)), {k: v for k, v in position.items() if k != 'snapshot_after'}
+
+
+def binlog_batches(position, batch_size, server_id=4242):
+    """Yields (batch, position) from the binlog, cut on transaction boundaries, until it is caught up."""
+    from pymysqlreplication import BinLogStreamReader
+    from pymysqlreplication.event import XidEvent
+    from pymysqlreplication.row_event import DeleteRowsEvent, UpdateRowsEvent, WriteRowsEvent
+
+    if position is None:
+        # first run: note the end of the binlog before the copy, the changes made while copying follow it
+        conn = pymysql.connect(**MYSQL)
+        with conn.cursor() as cursor:
+            cursor.execute('SHOW MASTER STATUS')
+            log_file, log_pos = cursor.fetchone()[:2]
+        conn.close()
+        position = {'log_file': log_file, 'log_pos': log_pos, 'snapshot_after': None}
+    if 'snapshot_after' in position:
+        for batch, position in snapshot_batches(position, batch_size):
+            yield batch, position
+
+    settings = {k: v for k, v in MYSQL.items() if k != 'database'}
+    stream = BinLogStreamReader(
+        connection_settings=settings,
+        server_id=server_id,
+        only_events=[WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, XidEvent],
+        only_schemas=[MYSQL['database']],
+        only_tables=[TABLE],
+        resume_stream=True,
+        log_file=position['log_file'],
+        log_pos=position['log_pos'],
+        blocking=False,
+    )
+    batch = ChangeBatch()
+    committed = position
+    try:
+        for event in stream:
+            if isinstance(event, XidEvent):
+                # only resume from commit points, a position inside a transaction cannot be decoded
+                committed = {'log_file': stream.log_file, 'log_pos': stream.log_pos}
+                if len(batch) >= batch_size:
+                    yield batch, committed
+                    batch = ChangeBatch()
+                continue
+            for row in event.rows:
+                if isinstance(event, WriteRowsEvent):
+                    batch.upsert(row['values'])
+                elif isinstance(event, DeleteRowsEvent):
+                    batch.delete(row['values']['rowid'])
+                else:
+                    if row['before_values']['rowid'] != row['after_values']['rowid']:
+                        batch.delete(row['before_values']['rowid'])
+                    batch.upsert(row['after_values'])
+    finally:
+        stream.close()
+    if len(batch) or committed != position:
+        yield batch, committed
+
+
+def changelog_batches(position, batch_size):
+    """Yields (batch, position) from the trigger filled changelog table until it is empty.
+
+    The changelog is its own resume point: rows are read in id order and, once the batch is applied
+    (the consumer asks for the next one), exactly the ids read are deleted. There is no high-water
+    mark, so a transaction committing after a higher id was read is picked up by a later poll instead
+    of being skipped. The changes of one row keep their order, the row lock makes a later change of
+    it get a higher id. A crash between the apply and the delete replays the batch, which is harmless
+    as upserts and deletes by rowid are idempotent. The position (last applied id) is informational.
+
+    The triggers of cdc_changelog.sql must be in place before the first run, which copies sales_data.
+    """
+    if position is None:
+        position = {'snapshot_after': None}
+    if 'snapshot_after' in position:
+        for batch, position in snapshot_batches(position, batch_size):
+            yield batch, position
+    conn = pymysql.connect(**MYSQL, cursorclass=pymysql.cursors.DictCursor)
+    try:
+        while True:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT id, op, rowid, product_id, customer_id, quantity FROM {CHANGELOG} ORDER BY id LIMIT %s",
+                    (batch_size,),
+                )
+                rows = cursor.fetchall()
+            conn.commit()
+            if not rows:
+                return
+            batch = ChangeBatch()
+            for row in rows:
+                if row['op'] == 'D':
+                    batch.delete(row['rowid'])
+                else:
+                    batch.upsert(row)
+            yield batch, {'id': rows[-1]['id']}
+            with conn.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {CHANGELOG} WHERE id IN ({', '.join(['%s'] * len(rows))})",
+                               [row['id'] for row in rows])
+            conn.commit()
+    finally:
+        conn.close()
+
+
+SOURCES = {'binlog': binlog_batches, 'changelog': changelog_batches}
+
+
+def run(source, batch_size=5000, poll_interval=1.0, once=False):
+    """Applies the changes of source to the warehouse, forever or until caught up (once)."""
+    pgsql_conn = psycopg2.connect(**PGSQL)
+    position = load_position(pgsql_conn, source)
+    print(f"Resuming {source} CDC from ", position)
+    try:
+        while True:
+            for batch, position in SOURCES[source](position, batch_size):
+                start = time.perf_counter()
+                apply_batch(pgsql_conn, batch, source, position)
+                if len(batch):
+                    print(f"Applied {len(batch.upserts)} upserts and {len(batch.deletes)} deletes "
+                          f"({len(batch)} events) in {time.perf_counter() - start:.3f}s, position = ", position)
+            if once:
+                break
+            time.sleep(poll_interval)
+    finally:
+        pgsql_conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Change data capture from MySQL sales_data to the PostgreSQL warehouse')
+    parser.add_argument('--source', choices=sorted(SOURCES), default='binlog')
+    parser.add_argument('--batch-size', type=int, default=5000, help='events applied per warehouse transaction')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds between polls once caught up')
+    parser.add_argument('--once', action='store_true', help='stop once caught up instead of following the source')
+    args = parser.parse_args()
+    run(args.source, args.batch_size, args.poll_interval, args.once)
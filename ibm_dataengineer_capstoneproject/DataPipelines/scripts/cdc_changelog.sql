@@ -0,0 +1,28 @@
+-- Changelog table and triggers for `cdc.py --source changelog`.
+-- Use it when the binlog cannot be read (no REPLICATION privileges, managed MySQL...).
+-- docker exec -i ibm_project_mysql mysql -u root -proot sales < cdc_changelog.sql
+
+CREATE TABLE IF NOT EXISTS `sales_data_changelog` (
+  `id` bigint NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  `op` char(1) NOT NULL,
+  `rowid` int NOT NULL,
+  `product_id` int DEFAULT NULL,
+  `customer_id` int DEFAULT NULL,
+  `quantity` int DEFAULT NULL,
+  `changed_at` timestamp(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TRIGGER `sales_data_cdc_insert` AFTER INSERT ON `sales_data` FOR EACH ROW
+  INSERT INTO `sales_data_changelog` (`op`, `rowid`, `product_id`, `customer_id`, `quantity`)
+  VALUES ('I', NEW.`rowid`, NEW.`product_id`, NEW.`customer_id`, NEW.`quantity`);
+
+-- an update of the key is logged as a delete of the old rowid followed by the new row
+CREATE TRIGGER `sales_data_cdc_update` AFTER UPDATE ON `sales_data` FOR EACH ROW
+  INSERT INTO `sales_data_changelog` (`op`, `rowid`, `product_id`, `customer_id`, `quantity`)
+  SELECT 'D', OLD.`rowid`, NULL, NULL, NULL FROM DUAL WHERE OLD.`rowid` <> NEW.`rowid`
+  UNION ALL
+  SELECT 'U', NEW.`rowid`, NEW.`product_id`, NEW.`customer_id`, NEW.`quantity`;
+
+CREATE TRIGGER `sales_data_cdc_delete` AFTER DELETE ON `sales_data` FOR EACH ROW
+  INSERT INTO `sales_data_changelog` (`op`, `rowid`)
+  VALUES ('D', OLD.`rowid`);
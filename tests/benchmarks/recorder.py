@@ -0,0 +1,139 @@
+"""Throughput/latency/memory recorder with a JSON history for regression checks."""
+import contextlib
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, fall back to the process high-water mark
+    psutil = None
+
+# the peak RSS helper is shared with the pipeline's own run metrics
+_AIRFLOW_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'ibm_dataengineer_capstoneproject', 'DataPipelines', 'airflow')
+if os.path.abspath(_AIRFLOW_DIR) not in sys.path:
+    sys.path.insert(0, os.path.abspath(_AIRFLOW_DIR))
+from instrumentation import peak_rss
+
+
+def _current_rss() -> int:
+    """Returns the resident set size of this process in bytes."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return peak_rss() or 0
+
+
+class _RssSampler(threading.Thread):
+    """Background thread polling the RSS so each benchmark gets its own peak."""
+
+    def __init__(self, interval:float=0.01) -> None:
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, _current_rss())
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, _current_rss())
+        return self.peak
+
+
+class BenchmarkRecorder:
+    """Measures one benchmark run and appends the result to a JSON history file.
+
+    Usage:
+        with recorder.stage('parse'):
+            df = parse_log_file(path)
+        recorder.finish(rows=len(df))
+
+    Observations:
+        - Stage latencies are wall-clock seconds, rows/s is computed over the sum of all stages
+        - A run is flagged as a regression when its rows/s falls below the median of the previous
+          ``window`` runs of the same benchmark and size by more than ``tolerance``
+    """
+
+    def __init__(self, name:str, rows:int, history_path:str, tolerance:float=0.2, window:int=5) -> None:
+        self.name = name
+        self.rows = rows
+        self.history_path = history_path
+        self.tolerance = tolerance
+        self.window = window
+        self.stages:dict[str, float] = {}
+        self.result:dict | None = None
+        self._sampler = _RssSampler()
+        self._sampler.start()
+
+    @contextlib.contextmanager
+    def stage(self, name:str):
+        """Times the wrapped block and stores it under ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def finish(self, rows:int | None = None) -> dict:
+        """Stops measuring, appends the run to the history and returns it."""
+        peak = self._sampler.stop()
+        rows = self.rows if rows is None else rows
+        elapsed = sum(self.stages.values())
+        self.result = {
+            'name': self.name,
+            'rows': self.rows,
+            'rows_processed': rows,
+            'elapsed_s': round(elapsed, 6),
+            'rows_per_s': round(rows / elapsed, 2) if elapsed > 0 else None,
+            'peak_rss_bytes': peak,
+            'process_peak_rss_bytes': peak_rss(),
+            'stages_s': {k: round(v, 6) for k, v in self.stages.items()},
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.node(),
+        }
+        self.result['regression'] = self._is_regression(self.result)
+        self._append(self.result)
+        return self.result
+
+    def abort(self) -> None:
+        """Stops the RSS sampler without recording anything (skipped or failed runs)."""
+        if self._sampler.is_alive():
+            self._sampler.stop()
+
+    def _load(self) -> list[dict]:
+        if not os.path.exists(self.history_path):
+            return []
+        with open(self.history_path) as f:
+            return json.load(f)
+
+    def _append(self, result:dict) -> None:
+        history = self._load()
+        history.append(result)
+        os.makedirs(os.path.dirname(os.path.abspath(self.history_path)), exist_ok=True)
+        tmp = f'{self.history_path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(history, f, indent=2)
+        os.replace(tmp, self.history_path)
+
+    def _is_regression(self, result:dict) -> bool:
+        previous = [
+            run['rows_per_s'] for run in self._load()
+            if run['name'] == self.name and run['rows'] == self.rows and run.get('rows_per_s')
+        ][-self.window:]
+        if not previous or result['rows_per_s'] is None:
+            return False
+        return result['rows_per_s'] < statistics.median(previous) * (1 - self.tolerance)
@@ -0,0 +1,134 @@
+"""Synthetic data generators shaped like the project's source files.
+
+Every generator is deterministic for a given ``rows``/``seed`` pair so that
+runs recorded in the benchmark history are comparable with each other.
+"""
+import csv
+import datetime
+import os
+import random
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December']
+CATEGORIES = ['Books', 'Movies', 'Songs', 'Software', 'Games']
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:89.0) Gecko/20100101 Firefox/89.0',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148',
+    'curl/7.68.0',
+]
+PATHS = ['/index.html', '/products.html', '/cart.html', '/checkout.html', '/images/logo.png',
+         '/css/main.css', '/js/app.js', '/search?q=laptop', '/account/login', '/favicon.ico']
+STATUSES = ['200'] * 16 + ['301', '304', '404', '500']
+
+
+def write_oltpdata(path:str, rows:int, seed:int=0) -> str:
+    """Writes an ``oltpdata.csv`` look-alike (product_id, customer_id, price, quantity, timestamp), without header."""
+    rnd = random.Random(seed)
+    start = datetime.datetime(2020, 9, 5, 16, 20, 3)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        for i in range(rows):
+            writer.writerow((
+                rnd.randint(1000, 9999),
+                rnd.randint(1, 99999),
+                rnd.randint(1, 2500),
+                rnd.randint(1, 5),
+                (start + datetime.timedelta(seconds=i)).strftime('%Y-%m-%d %H:%M:%S'),
+            ))
+    return path
+
+
+def write_sales(path:str, rows:int, seed:int=0) -> str:
+    """Writes the MySQL ``sales_data`` export consumed by ``automation.insert_records``."""
+    rnd = random.Random(seed)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('rowid', 'product_id', 'customer_id', 'quantity'))
+        for i in range(rows):
+            writer.writerow((i + 1, rnd.randint(1000, 9999), rnd.randint(1, 99999), rnd.randint(1, 5)))
+    return path
+
+
+def write_access_log(path:str, rows:int, seed:int=0, ips:int=2000) -> str:
+    """Writes a combined-format web server log like ``accesslog.txt``."""
+    rnd = random.Random(seed)
+    addresses = [f'{rnd.randint(1, 223)}.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}' for _ in range(ips)]
+    # keep the address the DAG filters on present in every generated log
+    addresses[0] = '198.46.149.143'
+    start = datetime.datetime(2021, 8, 1, 0, 0, 0)
+    with open(path, 'w') as f:
+        for i in range(rows):
+            ts = (start + datetime.timedelta(seconds=i)).strftime('%d/%b/%Y:%H:%M:%S +0000')
+            f.write(
+                f'{rnd.choice(addresses)} - - [{ts}] "GET {rnd.choice(PATHS)} HTTP/1.1" '
+                f'{rnd.choice(STATUSES)} {rnd.randint(100, 50000)} "-" "{rnd.choice(USER_AGENTS)}"\n'
+            )
+    return path
+
+
+def write_softcart_dimensions(directory:str, rows:int, seed:int=0) -> str:
+    """Writes the SoftCart ``Dim*.csv`` and ``FactSales.csv`` files read by ``DataWarehouse/scripts/insert.py``.
+
+    Dimension tables stay small (as they are in the real warehouse); ``rows`` sizes the fact table.
+    """
+    rnd = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    countries = 56
+    items = 100
+    days = 3 * 365
+
+    with open(os.path.join(directory, 'DimCategory.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('categoryid', 'category'))
+        writer.writerows((i + 1, name) for i, name in enumerate(CATEGORIES))
+
+    with open(os.path.join(directory, 'DimCountry.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('countryid', 'country'))
+        writer.writerows((i + 1, f'Country{i + 1}') for i in range(countries))
+
+    with open(os.path.join(directory, 'DimDate.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('dateid', 'date', 'Day', 'Month', 'Year', 'Monthname', 'Quarter'))
+        first = datetime.date(2019, 1, 1)
+        for i in range(days):
+            d = first + datetime.timedelta(days=i)
+            writer.writerow((i + 1, d.isoformat(), d.day, d.month, d.year, MONTH_NAMES[d.month - 1], (d.month - 1) // 3 + 1))
+
+    with open(os.path.join(directory, 'DimItem.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('itemid', 'itemname', 'price', 'categoryid', 'countryid'))
+        for i in range(items):
+            writer.writerow((i + 1, f'item{i + 1}', round(rnd.uniform(1.00, 2500.00), 2), (i % len(CATEGORIES)) + 1, rnd.randint(1, countries)))
+
+    with open(os.path.join(directory, 'FactSales.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('orderid', 'dateid', 'countryid', 'categoryid', 'amount'))
+        for i in range(rows):
+            writer.writerow((i + 1, rnd.randint(1, days), rnd.randint(1, countries), rnd.randint(1, len(CATEGORIES)), rnd.randint(1, 10000)))
+    return directory
+
+
+def catalog_documents(rows:int, seed:int=0) -> list[dict]:
+    """Builds catalog documents shaped like ``NoSQL/data/source.json``."""
+    rnd = random.Random(seed)
+    models = ['platina', 'bn20', 'cz', 'xm23', 'c3', 'pk2', 'k9', 'c12']
+    return [
+        {'type': rnd.choice(['smart phone', 'laptop', 'tablet']), 'model': rnd.choice(models), 'screen size': rnd.choice([5.5, 6, 6.5])}
+        for _ in range(rows)
+    ]
+
+
+def write_searchterms(path:str, rows:int, seed:int=0, terms:int=10000) -> str:
+    """Writes a ``searchterms.csv`` look-alike (day, month, year, searchterm) with a long tailed term distribution."""
+    rnd = random.Random(seed)
+    head = ['mobile 6 inch', 'gaming laptop', 'Gaming Laptop 16GB', 'ipad', 'dvd', 'kindle', 'laptop bag']
+    vocabulary = head + [f'term {i}' for i in range(terms - len(head))]
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('day', 'month', 'year', 'searchterm'))
+        for _ in range(rows):
+            rank = min(int(rnd.paretovariate(1.1)) - 1, len(vocabulary) - 1)
+            writer.writerow((rnd.randint(1, 28), rnd.randint(1, 12), rnd.randint(2019, 2021), vocabulary[rank]))
+    return path
@@ -0,0 +1,40 @@
+import pytest
+
+from tests.benchmarks.conftest import load_project_module
+
+SALES_DDL = """CREATE TABLE sales(
+rowid INTEGER PRIMARY KEY NOT NULL,
+product_id INTEGER NOT NULL,
+customer_id INTEGER NOT NULL,
+price FLOAT NOT NULL,
+quantity INTEGER NOT NULL,
+timestamp TIMESTAMP NOT NULL
+)"""
+
+
+@pytest.fixture(scope='module')
+def automation():
+    for name in ('pandas', 'sqlalchemy', 'pymysql', 'psycopg2'):
+        pytest.importorskip(name)
+    try:
+        # connects to the staging MySQL and the PostgreSQL warehouse on import
+        return load_project_module('DataPipelines/scripts/automation.py', 'bench_automation')
+    except Exception as e:
+        pytest.skip(f'automation.py could not connect: {e}')
+
+
+def test_insert_records(postgres, mysql, automation, pg_schema, bench_data, recorder, rows):
+    import pandas as pd
+
+    pg_schema(automation.pgsql_conn)
+    automation.pgsql_cursor.execute(SALES_DDL)
+    automation.pgsql_conn.commit()
+
+    with recorder.stage('read_csv'):
+        records = pd.read_csv(bench_data.sales(rows))
+    with recorder.stage('insert_records'):
+        automation.insert_records(records)
+    recorder.finish()
+
+    automation.pgsql_cursor.execute('SELECT COUNT(*) FROM sales')
+    assert automation.pgsql_cursor.fetchone()[0] == rows
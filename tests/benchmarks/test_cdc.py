@@ -0,0 +1,197 @@
+import os
+
+import pytest
+
+from tests.benchmarks.conftest import PROJECT, load_project_module
+from tests.benchmarks.test_automation import SALES_DDL
+
+STAGING_DDL = """CREATE TABLE sales_data(
+rowid int NOT NULL PRIMARY KEY,
+product_id int NOT NULL,
+customer_id int NOT NULL,
+quantity int NOT NULL
+)"""
+
+
+@pytest.fixture(scope='module')
+def cdc():
+    for name in ('pandas', 'psycopg2', 'pymysql'):
+        pytest.importorskip(name)
+    return load_project_module('DataPipelines/scripts/cdc.py', 'bench_cdc')
+
+
+@pytest.fixture
+def staging(mysql, cdc, monkeypatch):
+    """A scratch MySQL database with sales_data and the changelog triggers."""
+    import pymysql
+
+    database = f'sales_cdc_bench_{os.getpid()}'
+    server = pymysql.connect(**{k: v for k, v in cdc.MYSQL.items() if k != 'database'}, autocommit=True)
+    with server.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS {database}')
+        cursor.execute(f'CREATE DATABASE {database}')
+        cursor.execute(f'USE {database}')
+        cursor.execute(STAGING_DDL)
+        with open(os.path.join(PROJECT, 'DataPipelines', 'scripts', 'cdc_changelog.sql')) as f:
+            script = '\n'.join(line for line in f if not line.startswith('--'))
+        for statement in script.split(';'):
+            if statement.strip():
+                cursor.execute(statement)
+    monkeypatch.setitem(cdc.MYSQL, 'database', database)
+    yield server
+    with server.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS {database}')
+    server.close()
+
+
+@pytest.fixture
+def warehouse(postgres, cdc):
+    import psycopg2
+
+    conn = psycopg2.connect(**cdc.PGSQL)
+    yield conn
+    conn.close()
+
+
+def _sync(cdc, warehouse, source, batch_size=5000):
+    """Applies every pending change of source, returns the number of events applied."""
+    position = cdc.load_position(warehouse, source)
+    events = 0
+    for batch, position in cdc.SOURCES[source](position, batch_size):
+        cdc.apply_batch(warehouse, batch, source, position)
+        events += len(batch)
+    return events
+
+
+def _assert_synced(staging, warehouse):
+    with staging.cursor() as cursor:
+        cursor.execute('SELECT rowid, product_id, customer_id, quantity FROM sales_data ORDER BY rowid')
+        expected = [tuple(row) for row in cursor.fetchall()]
+    with warehouse.cursor() as cursor:
+        cursor.execute('SELECT rowid, product_id, customer_id, quantity FROM sales ORDER BY rowid')
+        assert [tuple(row) for row in cursor.fetchall()] == expected
+
+
+def test_changelog_cdc(cdc, staging, warehouse, pg_schema, recorder, rows):
+    pg_schema(warehouse)
+    with warehouse, warehouse.cursor() as cursor:
+        cursor.execute(SALES_DDL)
+    # the initial snapshot of the empty table, the changes below go through the changelog only
+    assert _sync(cdc, warehouse, 'changelog') == 0
+
+    with staging.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO sales_data VALUES (%s, %s, %s, %s)',
+            [(i, 1000 + i % 9000, i, 1 + i % 5) for i in range(1, rows + 1)],
+        )
+        cursor.execute('UPDATE sales_data SET quantity = quantity + 1 WHERE rowid % 10 = 0')
+        cursor.execute('DELETE FROM sales_data WHERE rowid % 7 = 0')
+
+    with recorder.stage('apply'):
+        events = _sync(cdc, warehouse, 'changelog')
+    recorder.finish(rows=events)
+
+    _assert_synced(staging, warehouse)
+    with staging.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {cdc.CHANGELOG}')
+        assert cursor.fetchone()[0] == 0
+    assert cdc.load_position(warehouse, 'changelog') is not None
+
+
+def test_changelog_keeps_late_commits(cdc, staging, warehouse, pg_schema):
+    import pymysql
+
+    pg_schema(warehouse)
+    with warehouse, warehouse.cursor() as cursor:
+        cursor.execute(SALES_DDL)
+    # the initial snapshot of the empty table, so the syncs below only read the changelog
+    assert _sync(cdc, warehouse, 'changelog') == 0
+    slow = pymysql.connect(**cdc.MYSQL)
+    try:
+        # the slow transaction takes the lower changelog id but commits after a poll saw a higher one
+        with slow.cursor() as cursor:
+            cursor.execute('INSERT INTO sales_data VALUES (1, 1001, 1, 1)')
+        with staging.cursor() as cursor:
+            cursor.execute('INSERT INTO sales_data VALUES (2, 1002, 2, 2)')
+
+        assert _sync(cdc, warehouse, 'changelog') == 1
+        with warehouse.cursor() as cursor:
+            cursor.execute('SELECT rowid FROM sales')
+            assert cursor.fetchall() == [(2,)]
+
+        slow.commit()
+    finally:
+        slow.close()
+    assert _sync(cdc, warehouse, 'changelog') == 1
+    _assert_synced(staging, warehouse)
+    with staging.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {cdc.CHANGELOG}')
+        assert cursor.fetchone()[0] == 0
+
+
+def _insert_preexisting(cdc, staging, count):
+    """Rows written before CDC started: they are only reachable through the initial snapshot."""
+    with staging.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO sales_data VALUES (%s, %s, %s, %s)',
+            [(i, 1000 + i, i, 1 + i % 5) for i in range(1, count + 1)],
+        )
+        cursor.execute(f'DELETE FROM {cdc.CHANGELOG}')
+
+
+def test_changelog_snapshot_resumes(cdc, staging, warehouse, pg_schema):
+    pg_schema(warehouse)
+    with warehouse, warehouse.cursor() as cursor:
+        cursor.execute(SALES_DDL)
+        # left behind by an earlier load: a row since deleted from staging and an outdated one
+        cursor.execute("INSERT INTO sales VALUES (5, 1005, 5, 1, 9, NOW()), (1000000, 1, 1, 1, 1, NOW())")
+    _insert_preexisting(cdc, staging, 100)
+
+    # the first run dies after copying one page
+    batches = cdc.changelog_batches(None, batch_size=30)
+    batch, position = next(batches)
+    cdc.apply_batch(warehouse, batch, 'changelog', position)
+    batches.close()
+    assert cdc.load_position(warehouse, 'changelog') == {'snapshot_after': 30}
+
+    with staging.cursor() as cursor:
+        cursor.execute('UPDATE sales_data SET quantity = 5 WHERE rowid IN (10, 60)')
+        cursor.execute('DELETE FROM sales_data WHERE rowid IN (20, 70)')
+        cursor.execute('INSERT INTO sales_data VALUES (101, 1101, 101, 1)')
+
+    _sync(cdc, warehouse, 'changelog', batch_size=30)
+
+    _assert_synced(staging, warehouse)
+    assert 'snapshot_after' not in cdc.load_position(warehouse, 'changelog')
+
+
+def test_binlog_cdc(cdc, staging, warehouse, pg_schema, recorder, rows):
+    pytest.importorskip('pymysqlreplication', reason='the binlog source needs the cdc extra: poetry install -E cdc')
+    with staging.cursor() as cursor:
+        cursor.execute("SHOW VARIABLES LIKE 'log_bin'")
+        if cursor.fetchone()[1] != 'ON':
+            pytest.skip('the MySQL binlog is disabled, see OLTP_Db/docker-compose.mysql.yml')
+    pg_schema(warehouse)
+    with warehouse, warehouse.cursor() as cursor:
+        cursor.execute(SALES_DDL)
+    _insert_preexisting(cdc, staging, 100)
+
+    # first run: snapshot of the existing rows, then the binlog from where it stood before the copy
+    _sync(cdc, warehouse, 'binlog')
+    _assert_synced(staging, warehouse)
+
+    with staging.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO sales_data VALUES (%s, %s, %s, %s)',
+            [(i, 1000 + i % 9000, i, 1 + i % 5) for i in range(101, rows + 101)],
+        )
+        cursor.execute('UPDATE sales_data SET quantity = quantity + 1 WHERE rowid % 10 = 0')
+        cursor.execute('UPDATE sales_data SET rowid = rowid + 1000000 WHERE rowid = 3')
+        cursor.execute('DELETE FROM sales_data WHERE rowid % 7 = 0')
+
+    with recorder.stage('apply'):
+        events = _sync(cdc, warehouse, 'binlog')
+    recorder.finish(rows=events)
+
+    _assert_synced(staging, warehouse)
+    assert set(cdc.load_position(warehouse, 'binlog')) == {'log_file', 'log_pos'}
@@ -0,0 +1,172 @@
+import hashlib
+import http.server
+import os
+import re
+import threading
+
+import pytest
+
+from tests.benchmarks.conftest import load_project_module
+
+
+class RangeRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serves one file with ETag, conditional GET and byte range support, like S3 does."""
+
+    path_to_serve = None
+    etag = None
+    ranges = True
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _headers(self, status, length, etag, extra=None):
+        self.send_response(status)
+        self.send_header('Content-Length', str(length))
+        self.send_header('ETag', etag)
+        if self.ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        for key, value in (extra or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+
+    def _respond(self, body):
+        size = os.path.getsize(self.path_to_serve)
+        etag = self.etag
+        if self.headers.get('If-None-Match') == etag:
+            self._headers(304, 0, etag)
+            return
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match and self.ranges and self.headers.get('If-Range', etag) == etag:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else size - 1
+            self._headers(206, end - start + 1, etag, {'Content-Range': f'bytes {start}-{end}/{size}'})
+            if body:
+                self._copy(start, end - start + 1)
+            return
+        self._headers(200, size, etag)
+        if body:
+            self._copy(0, size)
+
+    def _copy(self, start, length):
+        with open(self.path_to_serve, 'rb') as f:
+            f.seek(start)
+            while length > 0:
+                block = f.read(min(length, 1 << 20))
+                self.wfile.write(block)
+                length -= len(block)
+
+    def do_HEAD(self):
+        self._respond(body=False)
+
+    def do_GET(self):
+        self._respond(body=True)
+
+
+@pytest.fixture(scope='module')
+def extract():
+    path = os.path.join('DataPipelines', 'airflow')
+    load_project_module(os.path.join(path, 'instrumentation.py'), 'instrumentation')
+    return load_project_module(os.path.join(path, 'extract.py'), 'bench_extract')
+
+
+@pytest.fixture(scope='module')
+def weblog():
+    pytest.importorskip('pandas')
+    return load_project_module(os.path.join('DataPipelines', 'airflow', 'weblog.py'), 'weblog')
+
+
+def _serve(path, ranges):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        while block := f.read(1 << 20):
+            md5.update(block)
+    handler = type('Handler', (RangeRequestHandler,), {'path_to_serve': path, 'etag': f'"{md5.hexdigest()}"', 'ranges': ranges})
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}/accesslog.txt', path
+    httpd.shutdown()
+
+
+@pytest.fixture
+def server(bench_data, rows):
+    yield from _serve(bench_data.access_log(rows), ranges=True)
+
+
+@pytest.fixture
+def server_without_ranges(bench_data, rows):
+    yield from _serve(bench_data.access_log(rows), ranges=False)
+
+
+@pytest.mark.parametrize('parts', [1, 4])
+def test_download(extract, server, recorder, rows, parts, tmp_path, monkeypatch):
+    url, source = server
+    output = str(tmp_path / 'accesslog.txt')
+    monkeypatch.setattr(extract, 'MIN_PART_SIZE', 0)
+
+    with recorder.stage('download'):
+        result = extract.download(url, output, parts=parts)
+    with recorder.stage('conditional_get'):
+        again = extract.download(url, output, parts=parts)
+    recorder.finish()
+
+    assert result['status'] == 'downloaded'
+    assert result['parts'] == parts
+    assert again['status'] == 'not_modified'
+    with open(source, 'rb') as a, open(output, 'rb') as b:
+        assert a.read() == b.read()
+
+
+@pytest.mark.parametrize('parts, min_part_size', [(2, 0), (4, None)], ids=['parallel', 'below_min_part_size'])
+def test_download_resumes_parts(extract, server, rows, tmp_path, monkeypatch, parts, min_part_size):
+    url, source = server
+    output = str(tmp_path / 'accesslog.txt')
+    if min_part_size is not None:
+        monkeypatch.setattr(extract, 'MIN_PART_SIZE', min_part_size)
+    count = parts if min_part_size is not None else 1
+    monkeypatch.setattr(extract, '_download_single', None)
+
+    size = os.path.getsize(source)
+    with open(source, 'rb') as f:
+        head = f.read(size // 8)
+    # a previous attempt died after writing the start of the first part into the preallocated file
+    etag = extract.probe(url)['etag']
+    done = [len(head)] + [0] * (count - 1)
+    extract._save_state(output, {'partial': {'url': url, 'etag': etag, 'last_modified': None, 'size': size, 'parts': count, 'done': done}})
+    with open(f'{output}.tmp', 'wb') as f:
+        f.write(head)
+        f.truncate(size)
+
+    result = extract.download(url, output, parts=parts)
+
+    assert result['status'] == 'downloaded'
+    assert result['parts'] == count
+    assert result['received'] == size - len(head)
+    assert not os.path.exists(f'{output}.tmp')
+    with open(source, 'rb') as a, open(output, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_download_without_ranges(extract, server_without_ranges, rows, tmp_path, monkeypatch):
+    url, source = server_without_ranges
+    output = str(tmp_path / 'accesslog.txt')
+    monkeypatch.setattr(extract, 'MIN_PART_SIZE', 0)
+
+    result = extract.download(url, output, parts=4)
+
+    assert result['parts'] == 1
+    assert result['received'] == os.path.getsize(source)
+    with open(source, 'rb') as a, open(output, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_stream_parse(extract, weblog, server, recorder, rows):
+    url, source = server
+
+    with recorder.stage('stream_parse'):
+        streamed = weblog.parse_raw_lines(extract.stream_lines(url))
+    recorder.finish(rows=len(streamed))
+
+    assert len(streamed) == rows
+    assert streamed == weblog.parse_log_lines(source)
@@ -0,0 +1,123 @@
+import inspect
+import json
+import os
+import pstats
+import re
+
+import pytest
+
+from tests.benchmarks.conftest import load_project_module
+
+
+class FakeTaskInstance:
+    """Records the XCom pushes of a task, like airflow's TaskInstance."""
+
+    def __init__(self, task_id, map_index=-1):
+        self.task_id = task_id
+        self.map_index = map_index
+        self.xcom = {}
+
+    def xcom_push(self, key, value):
+        self.xcom[key] = value
+
+
+@pytest.fixture
+def instrumentation(monkeypatch):
+    module = load_project_module(os.path.join('DataPipelines', 'airflow', 'instrumentation.py'), 'bench_instrumentation')
+    monkeypatch.delenv('PIPELINE_PROFILE', raising=False)
+    return module
+
+
+def _written(directory, suffix):
+    return sorted(name for name in os.listdir(directory) if name.endswith(suffix))
+
+
+def test_summary(instrumentation):
+    metrics = instrumentation.RunMetrics('transform')
+    metrics.start()
+    metrics.rows_in, metrics.rows_out = 100, 10
+    metrics.bytes_read = 4096
+    metrics.add_time('regex', 0.25)
+    with metrics.timer('pandas'):
+        pass
+    metrics.stop()
+    metrics.finished = metrics.started + 1.0
+
+    summary = metrics.summary()
+
+    assert json.loads(json.dumps(summary)) == summary
+    assert summary['name'] == 'transform'
+    assert (summary['rows_in'], summary['rows_out'], summary['bytes_read']) == (100, 10, 4096)
+    assert summary['wall_s'] == 1.0
+    assert summary['regex_s'] == 0.25
+    assert summary['io_s'] == 0.0
+    assert summary['other_s'] == pytest.approx(1.0 - 0.25 - summary['pandas_s'], abs=1e-5)
+    assert summary['parse_rate_rows_s'] == 100.0
+    assert summary['peak_rss_bytes'] > 0
+
+
+def test_track_writes_metrics_and_profile(instrumentation, tmp_path):
+    with instrumentation.track('automation', profile='cprofile', output_dir=str(tmp_path)) as metrics:
+        assert instrumentation.current_metrics() is metrics
+        metrics.rows_in += 3
+    assert instrumentation.current_metrics() is not metrics
+
+    [written] = _written(tmp_path, '.metrics.json')
+    assert written.startswith('automation_')
+    with open(tmp_path / written) as f:
+        summary = json.load(f)
+    assert summary['rows_in'] == 3
+    assert os.path.exists(summary['profile']) and summary['profile'].endswith('.prof')
+    pstats.Stats(summary['profile'])
+
+
+def test_track_reports_failed_runs(instrumentation, tmp_path):
+    with pytest.raises(RuntimeError):
+        with instrumentation.track('automation', output_dir=str(tmp_path)) as metrics:
+            metrics.rows_in += 1
+            raise RuntimeError('boom')
+    [written] = _written(tmp_path, '.metrics.json')
+    with open(tmp_path / written) as f:
+        assert json.load(f)['rows_in'] == 1
+
+
+def test_track_rejects_unknown_profiler(instrumentation):
+    with pytest.raises(ValueError):
+        with instrumentation.track('automation', profile='perf'):
+            pass
+
+
+def test_track_profiler_failure_leaves_no_current_run(instrumentation, monkeypatch):
+    def missing_profiler(profile):
+        raise ModuleNotFoundError("No module named 'pyinstrument'")
+    monkeypatch.setattr(instrumentation, '_start_profiler', missing_profiler)
+
+    with pytest.raises(ModuleNotFoundError):
+        with instrumentation.track('automation', profile='pyinstrument'):
+            pass
+
+    assert instrumentation.current_metrics().name == 'untracked'
+
+
+@pytest.mark.parametrize('map_index, name', [(-1, 'transform'), (2, 'transform_2')])
+def test_track_pushes_to_xcom(instrumentation, monkeypatch, tmp_path, map_index, name):
+    ti = FakeTaskInstance('transform', map_index)
+    monkeypatch.setattr(instrumentation, '_task_instance', lambda: ti)
+
+    with instrumentation.track('ignored inside a task', output_dir=str(tmp_path)) as metrics:
+        metrics.rows_out += 5
+
+    assert ti.xcom['metrics']['name'] == name
+    assert ti.xcom['metrics']['rows_out'] == 5
+    [written] = _written(tmp_path, '.metrics.json')
+    assert re.fullmatch(rf'{name}_\d{{8}}T\d{{6}}\.metrics\.json', written)
+
+
+def test_instrumented_keeps_signature(instrumentation):
+    @instrumentation.instrumented()
+    def transform(filename, ip_addrs=None):
+        instrumentation.current_metrics().rows_in += 1
+        return instrumentation.current_metrics().name
+
+    assert inspect.signature(transform) == inspect.signature(transform.__wrapped__)
+    assert transform('accesslog.txt') == 'transform'
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from tests.benchmarks import synthetic
+from tests.benchmarks.conftest import load_project_module
+
+
+@pytest.fixture(scope='module')
+def log_index():
+    pytest.importorskip('numpy')
+    pytest.importorskip('pandas')
+    path = os.path.join('DataPipelines', 'airflow')
+    load_project_module(os.path.join(path, 'instrumentation.py'), 'instrumentation')
+    load_project_module(os.path.join(path, 'weblog.py'), 'weblog')
+    return load_project_module(os.path.join(path, 'log_index.py'), 'bench_log_index')
+
+
+def test_log_index(log_index, bench_data, recorder, rows, tmp_path):
+    source = bench_data.access_log(rows)
+    index_dir = str(tmp_path / 'accesslog.idx')
+
+    with recorder.stage('build'):
+        log_index.LogIndex.build(source, index_dir)
+    with recorder.stage('load'):
+        index = log_index.LogIndex.load(source, index_dir)
+    with recorder.stage('ip_rows'):
+        selected = index.rows('198.46.149.143')
+    with recorder.stage('top_n'):
+        report = index.report(10)
+    recorder.finish()
+
+    assert index.is_fresh()
+    assert report['rows'] == rows
+    assert len(selected) == index.ip_totals('198.46.149.143')['requests'] > 0
+    assert all(row['ip'] == '198.46.149.143' for row in selected)
+
+
+def test_load_fresh_rejects_stale_index(log_index, tmp_path):
+    source = synthetic.write_access_log(str(tmp_path / 'accesslog.txt'), 20)
+    index_dir = str(tmp_path / 'accesslog.idx')
+    with pytest.raises(FileNotFoundError):
+        log_index.LogIndex.load_fresh(source, index_dir)
+    log_index.LogIndex.build(source, index_dir)
+    assert log_index.LogIndex.load_fresh(source, index_dir).meta['rows'] == 20
+
+    with open(source, 'a') as f:
+        f.write('198.46.149.143 - - [01/Aug/2021:00:00:00 +0000] "GET / HTTP/1.1" 200 1 "-" "curl/7.68.0"\n')
+    with pytest.raises(ValueError):
+        log_index.LogIndex.load_fresh(source, index_dir)
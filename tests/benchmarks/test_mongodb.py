@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from tests.benchmarks import synthetic
+from tests.benchmarks.conftest import MONGO_HOST, load_project_module
+
+
+@pytest.fixture(scope='module')
+def mongodb_lib():
+    for name in ('pymongo', 'loguru'):
+        pytest.importorskip(name)
+    return load_project_module('NoSQL/libs/MongoDB.py', 'bench_mongodb')
+
+
+@pytest.fixture
+def client(mongo, mongodb_lib):
+    client = mongodb_lib.MongoDB(host=MONGO_HOST, user='root', password='root')
+    client.connect()
+    client.__set_db__('bench')
+    client.__set_collection__(f'catalog_{os.getpid()}')
+    yield client
+    client.client[client.db].drop_collection(client.collection)
+    client.close()
+
+
+def test_insert_many_find(client, recorder, rows):
+    documents = synthetic.catalog_documents(rows)
+
+    with recorder.stage('insert_many'):
+        client.insert_many(documents=documents)
+    with recorder.stage('find_all'):
+        found = client.find_all(query={'type': 'smart phone'})
+    with recorder.stage('find_limit'):
+        page = client.find_limit(query={}, limit=100, skip=rows // 2)
+    recorder.finish()
+
+    assert 0 < len(found) < rows
+    assert len(page) == min(100, rows - rows // 2)
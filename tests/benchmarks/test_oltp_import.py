@@ -0,0 +1,37 @@
+import pytest
+
+from tests.benchmarks.conftest import MYSQL_URL, load_project_module
+
+
+@pytest.fixture(scope='module')
+def oltp_import():
+    for name in ('pandas', 'sqlalchemy', 'pymysql'):
+        pytest.importorskip(name)
+    return load_project_module('OLTP_Db/scripts/import.py', 'bench_oltp_import')
+
+
+@pytest.fixture
+def scratch_database(mysql):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.engine import make_url
+
+    url = make_url(MYSQL_URL)
+    server = create_engine(url.set(database=''))
+    with server.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE IF NOT EXISTS `{url.database}`'))
+    yield MYSQL_URL
+    with server.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS `{url.database}`'))
+    server.dispose()
+
+
+def test_import(oltp_import, scratch_database, bench_data, recorder, rows, tmp_path):
+    source = bench_data.oltpdata(rows)
+
+    with recorder.stage('transform'):
+        csv = oltp_import.transform(source, str(tmp_path / 'oltpdata_transformed.csv'))
+    with recorder.stage('load'):
+        oltp_import.load(csv, scratch_database)
+    recorder.finish(rows=len(csv))
+
+    assert len(csv) == rows
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from tests.benchmarks import synthetic
+from tests.benchmarks.conftest import load_project_module
+
+
+@pytest.fixture(scope='module')
+def weblog():
+    pytest.importorskip('pandas')
+    path = os.path.join('DataPipelines', 'airflow')
+    load_project_module(os.path.join(path, 'instrumentation.py'), 'instrumentation')
+    return load_project_module(os.path.join(path, 'weblog.py'), 'weblog')
+
+
+@pytest.fixture(scope='module')
+def log_index(weblog):
+    pytest.importorskip('numpy')
+    return load_project_module(os.path.join('DataPipelines', 'airflow', 'log_index.py'), 'bench_log_index')
+
+
+def test_parse_log_file(weblog, bench_data, recorder, rows):
+    path = bench_data.access_log(rows)
+
+    with recorder.stage('parse'):
+        df = weblog.parse_log_file(path)
+    with recorder.stage('filter'):
+        selected = df[df['ip'] == '198.46.149.143']
+    recorder.finish(rows=len(df))
+
+    assert len(df) == rows
+    assert len(selected) > 0
+
+
+@pytest.mark.parametrize('indexed', [False, True], ids=['scan', 'indexed'])
+@pytest.mark.parametrize('lines', [0, 1, 50])
+@pytest.mark.parametrize('chunks', [1, 3, 7, 200])
+def test_chunked_transform_matches_single_pass(weblog, log_index, tmp_path, lines, chunks, indexed):
+    source = synthetic.write_access_log(str(tmp_path / 'accesslog.txt'), lines, ips=5)
+    ip_addrs = ['198.46.149.143', weblog.parse_log_file(source)['ip'].iloc[-1]] if lines else ['198.46.149.143']
+    expected = str(tmp_path / 'expected.txt')
+    df = weblog.parse_log_file(source)
+    weblog.write_transformed(df[df['ip'].isin(ip_addrs)], expected)
+
+    index = log_index.LogIndex.build(source, str(tmp_path / 'accesslog.idx')) if indexed else None
+    ranges = weblog.split_log_file(source, chunks)
+    parts = [weblog.transform_chunk(source, **r, ip_addrs=ip_addrs, output_dir=str(tmp_path), index=index) for r in ranges]
+    output = weblog.merge_chunks(parts, str(tmp_path / 'transformed_data.txt'))
+
+    assert len(ranges) <= max(1, min(chunks, lines))
+    assert [r['start'] for r in ranges[1:]] == [r['end'] for r in ranges[:-1]]
+    assert (ranges[0]['start'], ranges[-1]['end']) == (0, os.path.getsize(source))
+    with open(expected, 'rb') as a, open(output, 'rb') as b:
+        assert a.read() == b.read()
+    assert not any(os.path.exists(part) for part in parts)
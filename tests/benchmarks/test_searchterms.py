@@ -0,0 +1,79 @@
+import pytest
+
+from tests.benchmarks.conftest import load_project_module
+
+
+@pytest.fixture(scope='module')
+def searchterms():
+    for name in ('pandas', 'numpy', 'loguru'):
+        pytest.importorskip(name)
+    return load_project_module('BigDataAnalytics/libs/searchterms.py', 'bench_searchterms')
+
+
+def test_search_term_analytics(searchterms, bench_data, recorder, rows):
+    import pandas as pd
+
+    path = bench_data.searchterms(rows)
+    terms = searchterms.SearchTerms(path)
+    forecast = searchterms.SalesForecastModel(-48890.0, [24.3])
+
+    with recorder.stage('count_terms'):
+        shape = terms.shape()
+    with recorder.stage('gaming_laptop'):
+        gaming = terms.count_containing('gaming laptop')
+    with recorder.stage('top_terms'):
+        top = terms.top_terms(5)
+    with recorder.stage('top_terms_sketch'):
+        sketched = terms.top_terms(5, exact=False, capacity=100)
+    with recorder.stage('predict'):
+        predictions = forecast.predict(range(1900, 2100))
+    recorder.finish()
+
+    df = pd.read_csv(path)
+    assert shape == df.shape
+    assert gaming == df['searchterm'].str.lower().str.contains('gaming laptop', regex=False).sum()
+    assert top.to_dict() == df['searchterm'].value_counts().head(5).to_dict()
+    assert list(sketched.index) == list(top.index)
+    assert len(predictions) == 200
+
+
+def test_forecast_model_json_round_trip(searchterms, tmp_path):
+    model = searchterms.SalesForecastModel(-48890.0, [24.3])
+    path = str(tmp_path / 'sales_prediction.json')
+
+    model.to_json(path)
+    loaded = searchterms.SalesForecastModel.load(path)
+
+    assert loaded.intercept == model.intercept
+    assert loaded.coefficients.tolist() == model.coefficients.tolist()
+    assert loaded.features == ['year']
+    assert loaded.predict([2023]).tolist() == model.predict([2023]).tolist()
+
+
+@pytest.mark.parametrize('vector', [
+    {'type': 1, 'size': None, 'indices': None, 'values': [24.3]},
+    {'type': 0, 'size': 1, 'indices': [0], 'values': [24.3]},
+], ids=['dense', 'sparse'])
+def test_forecast_model_loads_spark_save(searchterms, tmp_path, vector):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    # the layout LinearRegressionModel.save() writes: <model>/data/part-*.parquet with the ml VectorUDT struct
+    vector_type = pa.struct([
+        ('type', pa.int8()), ('size', pa.int32()), ('indices', pa.list_(pa.int32())), ('values', pa.list_(pa.float64())),
+    ])
+    table = pa.table({
+        'intercept': pa.array([-48890.0]),
+        'coefficients': pa.array([vector], type=vector_type),
+        'scale': pa.array([1.0]),
+    })
+    model_dir = tmp_path / 'sales_prediction.model'
+    (model_dir / 'data').mkdir(parents=True)
+    (model_dir / 'metadata').mkdir()
+    pq.write_table(table, str(model_dir / 'data' / 'part-00000-c000.snappy.parquet'))
+
+    model = searchterms.SalesForecastModel.load(str(model_dir))
+
+    assert model.intercept == -48890.0
+    assert model.coefficients.tolist() == [24.3]
+    assert model.predict([2023]).tolist() == pytest.approx([-48890.0 + 24.3 * 2023])
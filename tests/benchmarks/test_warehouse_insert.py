@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from tests.benchmarks.conftest import PROJECT, load_project_module
+
+SQL_DIR = os.path.join(PROJECT, 'DataWarehouse', 'sql')
+
+
+@pytest.fixture(scope='module')
+def insert():
+    for name in ('pandas', 'psycopg2', 'faker'):
+        pytest.importorskip(name)
+    try:
+        # connects to the softcart warehouse on import
+        return load_project_module('DataWarehouse/scripts/insert.py', 'bench_insert')
+    except Exception as e:
+        pytest.skip(f'insert.py could not connect: {e}')
+
+
+def test_insert_sales(postgres, insert, pg_schema, bench_data, recorder, rows, monkeypatch):
+    pg_schema(insert.conn)
+    for ddl in ('softcartDimTables.sql', 'softcartFactTables.sql'):
+        with open(os.path.join(SQL_DIR, ddl)) as f:
+            insert.cur.execute(f.read())
+    insert.conn.commit()
+    monkeypatch.setattr(insert, 'SOURCE', bench_data.softcart(rows))
+
+    with recorder.stage('dimensions'):
+        insert.insert_categories()
+        insert.insert_countries()
+        insert.insert_dates()
+        insert.insert_items()
+    with recorder.stage('insert_sales'):
+        insert.insert_sales()
+    recorder.finish()
+
+    insert.cur.execute('SELECT COUNT(*) FROM "softCartFactSales"')
+    assert insert.cur.fetchone()[0] == rows